@@ -0,0 +1,115 @@
+import os
+import sys
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import config
+from modules.video_analysis import (init_worker, video_info, split_chunks, analyze_chunk, write_table, read_table,
+                                   TIMELINE_COLUMNS)
+
+# Offline emotion analysis of recorded session videos.
+# Writes one emotion timeline per video (a row per sampled frame) as CSV or Parquet.
+# Usage:
+#   python analyze_videos.py recordings/ --output timelines/ --stride 15 --workers 4
+#   python analyze_videos.py session1.mp4 session2.mp4 --format parquet
+#
+# Chunks are analyzed in parallel by worker processes and each finished chunk is saved
+# in <output>/<video>.parts/, so an interrupted run resumes where it stopped when started again.
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.webm')
+
+
+def find_videos(paths):
+    """
+    Expand the given files and directories into a list of video files.
+    """
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            videos.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                          if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return videos
+
+
+def analyze_video(pool, path, args):
+    """
+    Analyze one video, skipping the chunks already saved by a previous run.
+
+    Returns:
+        str: Path of the timeline written
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    output_path = os.path.join(args.output, f'{name}.emotions.{args.format}')
+    if os.path.exists(output_path) and not args.overwrite:
+        print(f'{path}: already analyzed ({output_path})')
+        return output_path
+
+    frame_count, fps = video_info(path)
+    if frame_count > 0:
+        chunk_frames = max(int(args.chunk_seconds * fps), args.stride)
+        chunks = split_chunks(frame_count, chunk_frames)
+    else:
+        # The container does not tell its frame count (e.g. WebM, streams): read the video sequentially,
+        # as one chunk ending wherever the frames run out
+        chunks = [(0, sys.maxsize)]
+
+    parts_dir = os.path.join(args.output, f'{name}.parts')
+    if args.overwrite:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    os.makedirs(parts_dir, exist_ok=True)
+
+    def part_path(start, end):
+        return os.path.join(parts_dir, f'{start:09d}-{end:09d}.{args.format}')
+
+    todo = [(start, end) for start, end in chunks if not os.path.exists(part_path(start, end))]
+    frames = frame_count if frame_count > 0 else 'unknown number of'
+    print(f'{path}: {frames} frames at {fps:.1f} fps, {len(chunks)} chunks, {len(chunks) - len(todo)} already done')
+
+    futures = {pool.submit(analyze_chunk, path, start, end, args.stride, fps, args.batch_size): (start, end)
+               for start, end in todo}
+    for done, future in enumerate(as_completed(futures), 1):
+        start, end = futures[future]
+        write_table(future.result(), part_path(start, end))
+        print(f'  chunk {done}/{len(todo)} (frames {start}-{end}) done')
+
+    parts = [read_table(part_path(start, end)) for start, end in chunks]
+    timeline = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=TIMELINE_COLUMNS)
+    write_table(timeline, output_path)
+    shutil.rmtree(parts_dir)
+    print(f'{path}: {len(timeline)} frames analyzed, {int(timeline["face"].sum())} with a face -> {output_path}')
+    return output_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Analyze the emotions of recorded session videos')
+    parser.add_argument('videos', nargs='+', help='Video files or directories of videos')
+    parser.add_argument('--output', default='timelines', help='Directory the timelines are written to')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='Timeline file format (Parquet requires pyarrow)')
+    parser.add_argument('--stride', type=int, default=5, help='Analyze one frame out of this many')
+    parser.add_argument('--chunk-seconds', type=float, default=60.0, help='Length of the chunks analyzed in parallel')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of worker processes')
+    parser.add_argument('--batch-size', type=int, default=config.BATCH_MAX_SIZE, help='Faces per emotion model call')
+    parser.add_argument('--analyzer', default=config.EMOTION_ANALYZER, help='Emotion analyzer backend')
+    parser.add_argument('--overwrite', action='store_true', help='Analyze videos again even if already done')
+    args = parser.parse_args()
+
+    videos = find_videos(args.videos)
+    if not videos:
+        print('No videos to analyze.')
+        sys.exit(1)
+
+    os.makedirs(args.output, exist_ok=True)
+
+    initargs = (
+        args.analyzer,
+        config.ANALYZER_OPTIONS.get(args.analyzer, {}),
+        config.DETECTION_WIDTH,
+        (config.FACE_CROP_SIZE, config.FACE_CROP_SIZE)
+    )
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=initargs) as pool:
+        for video in videos:
+            analyze_video(pool, video, args)
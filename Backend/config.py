@@ -0,0 +1,151 @@
+import os
+
+# Server settings, each one can be overridden through an environment variable
+
+# Number of worker threads running face detection and emotion inference
+INFERENCE_WORKERS = int(os.environ.get('EDUFACE_INFERENCE_WORKERS', 2))
+
+# Maximum number of frames allowed to wait for a free inference worker
+INFERENCE_QUEUE_SIZE = int(os.environ.get('EDUFACE_INFERENCE_QUEUE_SIZE', 32))
+
+# Where emotion inference runs: 'thread' (worker threads of the server process) or
+# 'process' (separate worker processes, each with its own model, fed through shared memory)
+INFERENCE_MODE = os.environ.get('EDUFACE_INFERENCE_MODE', 'thread')
+
+# Number of inference worker processes in 'process' mode
+INFERENCE_PROCESSES = int(os.environ.get('EDUFACE_INFERENCE_PROCESSES', os.cpu_count() or 2))
+
+# Seconds after which a batch sent to an inference worker process fails if it got no result
+INFERENCE_BATCH_TIMEOUT = float(os.environ.get('EDUFACE_INFERENCE_BATCH_TIMEOUT', 30.0))
+
+# Maximum number of connected client sessions, further connections are refused (0 for no limit)
+MAX_SESSIONS = int(os.environ.get('EDUFACE_MAX_SESSIONS', 200))
+
+# Maximum number of frames analyzed at once over all sessions, further frames are answered
+# with 'Server busy' (0 for no limit). Each session has at most one frame in flight.
+MAX_FRAMES_IN_FLIGHT = int(os.environ.get('EDUFACE_MAX_FRAMES_IN_FLIGHT', 64))
+
+# Server load (0-1) above which the service degrades to each tier in turn:
+# reduced frame rate, fallback analyzer, detection only
+DEGRADATION_THRESHOLDS = tuple(
+    float(v) for v in os.environ.get('EDUFACE_DEGRADATION_THRESHOLDS', '0.5,0.75,0.9').split(','))
+
+# Minimum seconds spent in a degraded tier before stepping back to a better one
+DEGRADATION_MIN_DWELL = float(os.environ.get('EDUFACE_DEGRADATION_MIN_DWELL', 5.0))
+
+# Time a face crop waits for crops from other sessions before its batch is analyzed
+BATCH_WINDOW_MS = float(os.environ.get('EDUFACE_BATCH_WINDOW_MS', 20))
+
+# Maximum number of face crops analyzed in one forward pass of the emotion model
+BATCH_MAX_SIZE = int(os.environ.get('EDUFACE_BATCH_MAX_SIZE', 16))
+
+# Search each session's frames only around its last face location
+FACE_TRACKING = os.environ.get('EDUFACE_FACE_TRACKING', 'true').lower() == 'true'
+
+# Number of tracked frames after which a full-frame face detection is forced
+FACE_FULL_SCAN_INTERVAL = int(os.environ.get('EDUFACE_FACE_FULL_SCAN_INTERVAL', 10))
+
+# Margin around the last face box searched while tracking, as a fraction of the box size
+FACE_TRACKING_MARGIN = float(os.environ.get('EDUFACE_FACE_TRACKING_MARGIN', 0.5))
+
+# Frames wider than this are downscaled before face detection (0 to detect at full resolution)
+DETECTION_WIDTH = int(os.environ.get('EDUFACE_DETECTION_WIDTH', 320))
+
+# Side length in pixels of the square face crop passed to the emotion analyzer
+FACE_CROP_SIZE = int(os.environ.get('EDUFACE_FACE_CROP_SIZE', 128))
+
+# Maximum number of faces analyzed per frame for clients in multi-face mode
+MAX_FACES = int(os.environ.get('EDUFACE_MAX_FACES', 8))
+
+# Maximum mean gray level difference (0-255) between two face crops of a session
+# for the previous emotion scores to be reused (0 disables the cache)
+EMOTION_CACHE_THRESHOLD = float(os.environ.get('EDUFACE_EMOTION_CACHE_THRESHOLD', 4.0))
+
+# Seconds during which cached emotion scores of a session may be reused
+EMOTION_CACHE_TTL = float(os.environ.get('EDUFACE_EMOTION_CACHE_TTL', 2.0))
+
+# Maximum number of sessions kept in the emotion cache
+EMOTION_CACHE_MAX_SESSIONS = int(os.environ.get('EDUFACE_EMOTION_CACHE_MAX_SESSIONS', 512))
+
+# Run MediaPipe Face Mesh on each face and skip emotion inference while head pose, eyes, mouth
+# and gaze stay the same; the geometric engagement features are added to the frame results
+LANDMARK_GATE = os.environ.get('EDUFACE_LANDMARK_GATE', 'false').lower() == 'true'
+
+# Maximum seconds the landmark gate reuses a session's scores before forcing emotion inference
+LANDMARK_REFRESH_INTERVAL = float(os.environ.get('EDUFACE_LANDMARK_REFRESH_INTERVAL', 3.0))
+
+# Emotion analyzer backend: 'deepface', 'onnx' (OpenCV DNN, no TensorFlow needed) or 'fer'
+EMOTION_ANALYZER = os.environ.get('EDUFACE_EMOTION_ANALYZER', 'deepface')
+
+# ONNX emotion model used by the 'onnx' analyzer
+ONNX_EMOTION_MODEL = os.environ.get(
+    'EDUFACE_ONNX_EMOTION_MODEL',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'emotion-ferplus-8.onnx')
+)
+
+# Cheaper analyzer used in the fallback tier under heavy load, e.g. 'onnx' (empty to skip that tier)
+FALLBACK_ANALYZER = os.environ.get('EDUFACE_FALLBACK_ANALYZER', '')
+
+# Constructor options of each analyzer backend
+ANALYZER_OPTIONS = {
+    'onnx': {'model_path': ONNX_EMOTION_MODEL}
+}
+
+# Weight of the newest frame in the moving average of each session's emotion scores (0-1)
+EMOTION_EMA_ALPHA = float(os.environ.get('EDUFACE_EMOTION_EMA_ALPHA', 0.3))
+
+# Percentage points another emotion must lead the current one by before the state switches
+EMOTION_HYSTERESIS = float(os.environ.get('EDUFACE_EMOTION_HYSTERESIS', 10.0))
+
+# Seconds between 'emotion_state' events while a session's state does not change
+EMOTION_STATE_HEARTBEAT = float(os.environ.get('EDUFACE_EMOTION_STATE_HEARTBEAT', 5.0))
+
+# Directory of the on-disk timeline of every session's emotion scores, empty (the default) to disable recording.
+# Its /timeline routes need the ADMIN_TOKEN, since sessions carry learner ids.
+EMOTION_TIMELINE_DIR = os.environ.get('EDUFACE_EMOTION_TIMELINE_DIR', '')
+
+# Seconds between two writes of the emotion timeline to disk, and most frames one /timeline/frames query returns
+TIMELINE_FLUSH_INTERVAL = float(os.environ.get('EDUFACE_TIMELINE_FLUSH_INTERVAL', 10.0))
+TIMELINE_MAX_FRAMES = int(os.environ.get('EDUFACE_TIMELINE_MAX_FRAMES', 10000))
+
+# Seconds between two 'class_summary' events sent to the instructor dashboards of a class
+CLASS_SUMMARY_INTERVAL = float(os.environ.get('EDUFACE_CLASS_SUMMARY_INTERVAL', 1.0))
+
+# Tell each client how often to send frames, based on server load and how stable its emotion state is
+ADAPTIVE_FRAME_INTERVAL = os.environ.get('EDUFACE_ADAPTIVE_FRAME_INTERVAL', 'true').lower() == 'true'
+
+# Frame interval requested from a client whose state is changing and from one whose state is stable
+# (or who is not visible, or when the server is saturated), in milliseconds
+FRAME_INTERVAL_MIN_MS = int(os.environ.get('EDUFACE_FRAME_INTERVAL_MIN_MS', 500))
+FRAME_INTERVAL_MAX_MS = int(os.environ.get('EDUFACE_FRAME_INTERVAL_MAX_MS', 3000))
+
+# Seconds without an emotion state change after which a session gets the longest frame interval
+FRAME_INTERVAL_STABLE_AFTER = float(os.environ.get('EDUFACE_FRAME_INTERVAL_STABLE_AFTER', 10.0))
+
+# From the reduced rate tier on, a session's frames are analyzed at most once per this many milliseconds,
+# even for clients that ignore 'frame_interval' or with ADAPTIVE_FRAME_INTERVAL off; frames in between
+# are answered with the session's last scores
+REDUCED_RATE_INTERVAL_MS = int(os.environ.get('EDUFACE_REDUCED_RATE_INTERVAL_MS', FRAME_INTERVAL_MAX_MS))
+
+# Capture settings of the local camera used by the kiosk mode (old/main.py), 0 or empty for the camera default
+CAMERA_WIDTH = int(os.environ.get('EDUFACE_CAMERA_WIDTH', 640))
+CAMERA_HEIGHT = int(os.environ.get('EDUFACE_CAMERA_HEIGHT', 480))
+CAMERA_FPS = float(os.environ.get('EDUFACE_CAMERA_FPS', 30))
+CAMERA_FOURCC = os.environ.get('EDUFACE_CAMERA_FOURCC', 'MJPG')
+
+# Token of the admin Socket.IO events (e.g. 'profile') and of the /timeline routes, empty to disable them
+ADMIN_TOKEN = os.environ.get('EDUFACE_ADMIN_TOKEN', '')
+
+# Directory the profiles captured at runtime are written to
+PROFILE_DIR = os.environ.get(
+    'EDUFACE_PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles')
+)
+
+# Milliseconds between two stack samples of a profile, default and longest capture in seconds
+PROFILE_INTERVAL_MS = float(os.environ.get('EDUFACE_PROFILE_INTERVAL_MS', 5))
+PROFILE_SECONDS = float(os.environ.get('EDUFACE_PROFILE_SECONDS', 30))
+PROFILE_MAX_SECONDS = float(os.environ.get('EDUFACE_PROFILE_MAX_SECONDS', 300))
+
+# Logging level of the server: DEBUG logs every frame, INFO only connections and warm-up
+LOG_LEVEL = os.environ.get('EDUFACE_LOG_LEVEL', 'INFO').upper()
@@ -1,8 +1,36 @@
-from socketio import ASGIApp
-from sockets.socket_manager import sio
-import uvicorn
+import logging
+import config
+
+logging.basicConfig(level=config.LOG_LEVEL, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+
+def create_app():
+    """
+    Build the ASGI app: Socket.IO and the plain HTTP routes next to it.
+
+    The server modules are imported here rather than at the top of the file: inference worker
+    processes are spawned, and a spawned process imports this file again (as __mp_main__),
+    which must not build a second server (models, executor, timeline maps) in every worker.
+    """
+    from socketio import ASGIApp
+    from sockets.socket_manager import sio, startup, shutdown
+    from routes.http_app import create_http_app
+    from routes.health import health
+    from routes.metrics import metrics
+    from routes.timeline import timeline_sessions, timeline_summary, timeline_frames
+
+    # Plain HTTP routes served next to Socket.IO
+    http_app = create_http_app({
+        '/health': health,
+        '/metrics': metrics,
+        '/timeline/sessions': timeline_sessions,
+        '/timeline/summary': timeline_summary,
+        '/timeline/frames': timeline_frames
+    })
+
+    return ASGIApp(sio, other_asgi_app=http_app, on_startup=startup, on_shutdown=shutdown)
 
-app = ASGIApp(sio)
 
 if __name__ == '__main__':
-    uvicorn.run(app, host='0.0.0.0', port=3000)
\ No newline at end of file
+    import uvicorn
+    uvicorn.run(create_app(), host='0.0.0.0', port=3000)
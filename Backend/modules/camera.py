@@ -1,40 +1,216 @@
 import cv2
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+class FpsMeter:
+    """
+    Measures the rate of a repeated event (frames captured, frames analyzed) averaged over consecutive windows.
+    """
+    def __init__(self, window=1.0):
+        """
+        Args:
+            window (float): Seconds over which the rate is averaged
+        """
+        self.window = window
+        self.count = 0
+        self.start = time.perf_counter()
+        self.fps = 0.0
+
+    def tick(self):
+        """
+        Record one event.
+        """
+        self.count += 1
+        elapsed = time.perf_counter() - self.start
+        if elapsed >= self.window:
+            self.fps = self.count / elapsed
+            self.count = 0
+            self.start += elapsed
 
 class Camera:
     """
     A class to handle camera operations using OpenCV.
     This class provides functionality to capture frames from a camera device.
+
+    In threaded mode a background thread captures continuously into a small ring of
+    preallocated frame buffers, so readers get the newest frame immediately and without
+    copying instead of waiting on the camera, and stale frames never queue up in the driver.
     """
-    def __init__(self, device_index=0):
+    def __init__(self, device_index=0, width=None, height=None, fps=None, fourcc=None,
+                 threaded=False, buffer_size=4):
         """
         Initialize the camera with the specified device index.
 
         Args:
             device_index (int): Index of the camera device to use (default: 0 for primary camera)
+            width (int): Requested capture width, None to keep the camera default
+            height (int): Requested capture height, None to keep the camera default
+            fps (float): Requested capture frame rate, None to keep the camera default
+            fourcc (str): Requested pixel format, e.g. 'MJPG', which lets most USB webcams
+                deliver higher resolutions at full frame rate
+            threaded (bool): If True, capture frames on a background thread (see start())
+            buffer_size (int): Number of frame buffers in the ring used in threaded mode,
+                at least the number of threads reading frames at the same time plus 2
         """
         self.cap = cv2.VideoCapture(device_index)
-        
+
+        # The pixel format must be set before the resolution for some backends to accept it
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+        self.buffer_size = max(buffer_size, 3)
+        self.buffers = None
+        self.leases = [0] * self.buffer_size  # Readers currently using each buffer
+        self.latest = -1  # Index of the buffer holding the newest frame
+        self.frame_id = 0  # Number of frames captured so far, identifies the newest frame
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.capture_fps = FpsMeter()
+
+        if threaded:
+            self.start()
+
+    def start(self):
+        """
+        Start capturing on a background thread. The ring buffers are allocated once,
+        with the shape of the first frame, and every later frame is decoded straight into them
+        (a buffer is replaced the first time it receives a frame of another resolution or format).
+        """
+        if self.thread is not None:
+            return
+
+        success, frame = self.cap.read()
+        if not success:
+            print("Ignoring empty camera frame.")
+            return
+
+        self.buffers = [np.empty_like(frame) for _ in range(self.buffer_size)]
+        self.buffers[0][...] = frame
+        self.latest = 0
+        self.frame_id = 1
+
+        # Keep as few frames as possible waiting in the driver, the ring buffer replaces its queue
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.running = True
+        self.thread = threading.Thread(target=self.capture_loop, name='camera-capture', daemon=True)
+        self.thread.start()
+
+    def capture_loop(self):
+        """
+        Capture frames until stopped, always writing into a buffer no reader is using.
+        """
+        while self.running:
+            with self.condition:
+                # The newest frame and frames borrowed by readers are never overwritten,
+                # so the capture only waits here if more readers than planned hold a frame
+                index = next((i for i in range(self.buffer_size)
+                              if i != self.latest and self.leases[i] == 0), None)
+            if index is None:
+                time.sleep(0.001)
+                continue
+
+            success, frame = self.cap.read(image=self.buffers[index])
+            if not success:
+                time.sleep(0.01)
+                continue
+
+            with self.condition:
+                if frame is not self.buffers[index]:
+                    # OpenCV only decodes into a buffer of the frame's shape and type; after a change of
+                    # resolution or format it returns a new array, which replaces the buffer of this slot
+                    self.buffers[index] = frame
+                self.latest = index
+                self.frame_id += 1
+                self.capture_fps.tick()
+                self.condition.notify_all()
+
+    @contextmanager
+    def latest_frame(self, newer_than=0, timeout=1.0):
+        """
+        Borrow the newest captured frame in threaded mode, without copying it.
+        The frame is not overwritten until the with block ends, so it must not be kept after it.
+
+        Args:
+            newer_than (int): Wait for a frame with an id above this one, e.g. the id of the last frame used
+            timeout (float): Seconds to wait for such a frame
+
+        Yields:
+            tuple: (frame_id, frame), or (frame_id, None) if no newer frame arrived in time
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame_id > newer_than or not self.running, timeout)
+            if self.latest < 0 or self.frame_id <= newer_than:
+                frame_id, index = self.frame_id, None
+            else:
+                frame_id, index = self.frame_id, self.latest
+                self.leases[index] += 1
+
+        try:
+            yield frame_id, None if index is None else self.buffers[index]
+        finally:
+            if index is not None:
+                with self.condition:
+                    self.leases[index] -= 1
+
     def read_frame(self):
         """
         Read a single frame from the camera.
+        In threaded mode this returns a copy of the newest captured frame without waiting on the camera.
 
         Returns:
             numpy.ndarray or None: The captured frame if successful, None if frame capture failed
         """
+        if self.thread is not None:
+            with self.latest_frame() as (_, frame):
+                return None if frame is None else frame.copy()
+
         success, frame = self.cap.read()
         if not success:
             print("Ignoring empty camera frame.")
             return None
         return frame
-    
+
+    def stats(self):
+        """
+        Get the capture settings the camera actually applied and the measured capture rate.
+
+        Returns:
+            dict: Capture statistics
+        """
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fourcc': ''.join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)),
+            'requestedFps': self.cap.get(cv2.CAP_PROP_FPS),
+            'captureFps': self.capture_fps.fps,
+            'framesCaptured': self.frame_id
+        }
+
     def release(self):
         """
         Release the camera resources and close all OpenCV windows.
         This method should be called when the camera is no longer needed.
         """
+        if self.thread is not None:
+            self.running = False
+            with self.condition:
+                self.condition.notify_all()
+            self.thread.join(timeout=1)
+            self.thread = None
         self.cap.release()
         cv2.destroyAllWindows()
-        
+
     def is_opened(self):
         """
         Check if the camera is currently opened and available.
@@ -42,4 +218,4 @@ class Camera:
         Returns:
             bool: True if the camera is opened, False otherwise
         """
-        return self.cap.isOpened() 
\ No newline at end of file
+        return self.cap.isOpened()
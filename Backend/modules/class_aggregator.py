@@ -0,0 +1,111 @@
+import time
+import numpy as np
+from modules.emotion_analyzer import EMOTION_LABELS
+
+
+class ClassAggregate:
+    """
+    Running totals of the learners of one class.
+    """
+    def __init__(self):
+        self.learners = 0
+        self.faces_missing = 0  # Learners whose last frame had no face (or who sent none yet)
+        self.states = dict.fromkeys(EMOTION_LABELS, 0)  # Learners per smoothed emotion state
+        self.score_sum = np.zeros(len(EMOTION_LABELS), dtype=np.float64)  # Sum of the latest scores of visible faces
+
+
+class ClassAggregator:
+    """
+    A class that keeps class-level emotion aggregates up to date as frames are analyzed.
+
+    Each learner's latest contribution (scores and smoothed state) is remembered, so a new frame
+    only replaces that contribution in the totals of its class: the cost per frame does not grow
+    with the size of the class, and a summary is read straight from the totals.
+    """
+
+    def __init__(self):
+        self.classes = {}  # class id -> ClassAggregate
+        self.learners = {}  # sid -> [class id, latest scores or None, state emotion or None]
+
+    def join(self, sid, class_id):
+        """
+        Add a learner to a class. The learner counts as missing a face until its first analyzed frame.
+        """
+        self.leave(sid)
+        aggregate = self.classes.setdefault(class_id, ClassAggregate())
+        aggregate.learners += 1
+        self.learners[sid] = [class_id, None, None]
+        self.add_contribution(aggregate, self.learners[sid])
+
+    def update(self, sid, scores, emotion):
+        """
+        Replace the contribution of a learner with its latest frame.
+
+        Args:
+            sid (str): Session of the learner
+            scores (numpy.ndarray or None): Scores ordered as EMOTION_LABELS, None if no face was found
+            emotion (str or None): Smoothed emotion state of the learner
+        """
+        entry = self.learners.get(sid)
+        if entry is None:
+            return
+
+        aggregate = self.classes[entry[0]]
+        self.remove_contribution(aggregate, entry)
+        entry[1] = None if scores is None else np.asarray(scores, dtype=np.float64)
+        entry[2] = emotion
+        self.add_contribution(aggregate, entry)
+
+    def leave(self, sid):
+        """
+        Remove a learner from its class, e.g. when its client disconnects.
+        """
+        entry = self.learners.pop(sid, None)
+        if entry is None:
+            return
+
+        aggregate = self.classes[entry[0]]
+        self.remove_contribution(aggregate, entry)
+        aggregate.learners -= 1
+        if aggregate.learners == 0:
+            del self.classes[entry[0]]
+
+    def add_contribution(self, aggregate, entry):
+        _, scores, emotion = entry
+        if scores is None:
+            aggregate.faces_missing += 1
+        else:
+            aggregate.score_sum += scores
+        if emotion is not None:
+            aggregate.states[emotion] += 1
+
+    def remove_contribution(self, aggregate, entry):
+        _, scores, emotion = entry
+        if scores is None:
+            aggregate.faces_missing -= 1
+        else:
+            aggregate.score_sum -= scores
+        if emotion is not None:
+            aggregate.states[emotion] -= 1
+
+    def summary(self, class_id):
+        """
+        Get the aggregates of a class.
+
+        Returns:
+            dict: Learner counts, learners per emotion state and the mean scores of the visible faces
+        """
+        aggregate = self.classes.get(class_id)
+        if aggregate is None:
+            aggregate = ClassAggregate()
+
+        visible = aggregate.learners - aggregate.faces_missing
+        distribution = aggregate.score_sum / visible if visible else np.zeros(len(EMOTION_LABELS))
+        return {
+            'classId': class_id,
+            'time': time.time(),
+            'learners': aggregate.learners,
+            'facesMissing': aggregate.faces_missing,
+            'states': dict(aggregate.states),
+            'distribution': dict(zip(EMOTION_LABELS, np.round(distribution, 1).tolist()))
+        }
@@ -1,43 +1,59 @@
-from deepface import DeepFace
+from modules.emotion_analyzer import EmotionAnalyzer
+from modules.face_preprocessor import FacePreprocessor
+import logging
+
+logger = logging.getLogger(__name__)
 
 # https://github.com/serengil/deepface
+# The DeepFace emotion model outputs its scores in the order of EMOTION_LABELS
 
-class DeepFaceAnalyzer:
+class DeepFaceAnalyzer(EmotionAnalyzer):
     """
     A class that provides emotion analysis functionality using the DeepFace library.
     This class serves as a wrapper around DeepFace's emotion analysis capabilities.
+
+    Faces are fed straight to the emotion model, instead of going through DeepFace.analyze
+    which would detect the face again in each crop FaceExtractor already found.
     """
-    
-    def get_emotion(self, frame):
+
+    # Input size of the DeepFace emotion model (grayscale)
+    MODEL_INPUT_SIZE = (48, 48)
+
+    def __init__(self):
+        # DeepFace pulls in TensorFlow, so it is only imported by load()
+        self.DeepFace = None
+        self.model = None
+        # Same preprocessing DeepFace applies before the emotion model: grayscale, 48x48, [0, 1]
+        self.preprocessor = FacePreprocessor(self.MODEL_INPUT_SIZE)
+
+    def load(self):
         """
-        Analyzes the emotion in a given frame using DeepFace.
-        Returns the dominant emotion as a string (legacy method).
+        Import DeepFace and build the emotion model. Does nothing if already loaded.
         """
-        try:
-            emotions = DeepFace.analyze(
-                frame,
-                actions=['emotion'],
-                enforce_detection=False,
-                silent=True
-            )
-            return emotions[0]['dominant_emotion']
-        except Exception as e:
-            print(f"Error in get_emotion: {str(e)}")
-            return None
+        if self.model is not None:
+            return
+
+        from deepface import DeepFace
+        self.DeepFace = DeepFace
+        self.model = DeepFace.build_model(model_name='Emotion', task='facial_attribute')
 
-    def get_emotions(self, frame):
+    def get_emotions_batch(self, faces):
         """
-        Analyzes the emotion in a given frame using DeepFace.
-        Returns a dictionary of all emotions and their scores, or None if analysis fails.
+        Analyzes several already cropped faces with a single forward pass of the emotion model.
+        No face detection is run: each image must contain only the face.
+
+        Args:
+            faces (list): Face images in BGR format
+
+        Returns:
+            numpy.ndarray or None: Array of shape (len(faces), 7) with the emotion scores (in percent)
+                ordered as EMOTION_LABELS, or None if analysis fails
         """
         try:
-            emotions = DeepFace.analyze(
-                frame,
-                actions=['emotion'],
-                enforce_detection=False,
-                silent=True
-            )
-            return emotions[0]['emotion']
-        except Exception as e:
-            print(f"Error in get_emotions_dict: {str(e)}")
-            return None
\ No newline at end of file
+            self.load()
+            # A direct call skips the per-call setup of predict(), which dominates for batches this small
+            predictions = self.model.model(self.preprocessor.prepare(faces), training=False).numpy()
+            return 100 * predictions / predictions.sum(axis=1, keepdims=True)
+        except Exception:
+            logger.exception('DeepFace emotion analysis failed')
+            return None
@@ -0,0 +1,94 @@
+import time
+
+# Service tiers, from full analysis to the cheapest answer the server can still give
+TIERS = ['full', 'reduced_rate', 'fallback_analyzer', 'detection_only']
+FULL, REDUCED_RATE, FALLBACK_ANALYZER, DETECTION_ONLY = range(len(TIERS))
+
+
+class DegradationController:
+    """
+    A class that picks the service tier of the server from its load, so it degrades in steps
+    instead of letting latency grow for everyone when too many learners stream at once.
+
+    The load is smoothed, tiers go up as soon as the smoothed load crosses their threshold
+    and come back down one at a time, once the load has stayed below the threshold by a margin
+    for a while, so the tier does not flap around a threshold.
+    """
+
+    def __init__(self, thresholds=(0.5, 0.75, 0.9), hysteresis=0.1, min_dwell=5.0, alpha=0.2,
+                 skip_tiers=()):
+        """
+        Initialize the controller.
+
+        Args:
+            thresholds (tuple): Load (0-1) above which each tier after 'full' is entered
+            hysteresis (float): How far below its threshold the load must fall to leave a tier
+            min_dwell (float): Minimum seconds spent in a tier before stepping back down
+            alpha (float): Weight of the newest load sample in the smoothed load (0-1)
+            skip_tiers (tuple): Tiers that are not available, e.g. FALLBACK_ANALYZER without a fallback analyzer
+        """
+        self.thresholds = tuple(thresholds)
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.alpha = alpha
+        self.skip_tiers = set(skip_tiers)
+
+        self.load = 0.0
+        self.tier = FULL
+        self.since = time.monotonic()
+        self.transitions = []  # (time, from tier, to tier, load) of recent transitions
+        self.max_transitions = 100
+
+    @property
+    def name(self):
+        return TIERS[self.tier]
+
+    def update(self, load):
+        """
+        Feed a new load sample.
+
+        Args:
+            load (float): Current load, from 0 (idle) to 1 (saturated)
+
+        Returns:
+            tuple or None: (previous_tier, new_tier) if the tier changed, None otherwise
+        """
+        now = time.monotonic()
+        self.load += self.alpha * (load - self.load)
+
+        target = sum(self.load >= threshold for threshold in self.thresholds)
+        while target in self.skip_tiers:
+            target -= 1
+
+        if target > self.tier:
+            return self.switch(target, now)
+
+        if target < self.tier and now - self.since >= self.min_dwell:
+            # Leave the current tier only once the load is clearly below the threshold that entered it
+            below = self.tier - 1
+            while below in self.skip_tiers:
+                below -= 1
+            if self.load < self.thresholds[self.tier - 1] - self.hysteresis:
+                return self.switch(below, now)
+
+        return None
+
+    def switch(self, tier, now):
+        previous, self.tier, self.since = self.tier, tier, now
+        self.transitions.append((time.time(), TIERS[previous], TIERS[tier], round(self.load, 3)))
+        del self.transitions[:-self.max_transitions]
+        return previous, tier
+
+    def status(self):
+        """
+        Get the current tier and the recent transitions.
+
+        Returns:
+            dict: Tier status
+        """
+        return {
+            'tier': self.tier,
+            'name': self.name,
+            'load': round(self.load, 3),
+            'transitions': [{'time': t, 'from': a, 'to': b, 'load': load} for t, a, b, load in self.transitions]
+        }
@@ -0,0 +1,114 @@
+import importlib
+import numpy as np
+
+# Emotion labels shared by every analyzer, in the order their score vectors use
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+# Analyzer name -> 'module:ClassName'. A module is only imported when its analyzer is created,
+# so unused backends and their dependencies (TensorFlow, FER, ...) are never loaded.
+ANALYZERS = {
+    'deepface': 'modules.deep_face_analyzer:DeepFaceAnalyzer',
+    'fer': 'modules.fer_analyzer:FerAnalyzer',
+    'onnx': 'modules.onnx_emotion_analyzer:OnnxEmotionAnalyzer'
+}
+
+
+class EmotionAnalyzer:
+    """
+    Common interface of the emotion analyzers.
+
+    Subclasses implement get_emotions_batch, which scores already cropped faces and returns
+    one row per face with the scores (in percent) of EMOTION_LABELS (NaN for a crop in which
+    the analyzer found no face), and may override load
+    to defer loading their model until it is needed.
+    """
+
+    def load(self):
+        """
+        Load the model. Does nothing if already loaded.
+        """
+
+    def warm_up(self, face_size=(128, 128)):
+        """
+        Run one inference on a blank face so the first real frame does not pay for graph setup.
+
+        Args:
+            face_size (tuple): (width, height) of the dummy face image
+        """
+        self.load()
+        self.get_emotions_batch([np.zeros((face_size[1], face_size[0], 3), dtype=np.uint8)])
+
+    def get_emotions_batch(self, faces):
+        """
+        Analyze several already cropped faces at once.
+
+        Args:
+            faces (list): Face images in BGR format
+
+        Returns:
+            numpy.ndarray or None: Array of shape (len(faces), 7) with the emotion scores (in percent)
+                ordered as EMOTION_LABELS, NaN rows for faces that could not be scored,
+                or None if analysis fails
+        """
+        raise NotImplementedError
+
+    def get_emotions(self, frame):
+        """
+        Analyze a single face image.
+        Returns a dictionary of all emotions and their scores, or None if analysis fails.
+        """
+        scores = self.get_emotions_batch([frame])
+        if not has_scores(scores):
+            return None
+        return dict(zip(EMOTION_LABELS, scores[0].tolist()))
+
+    def get_emotion(self, frame):
+        """
+        Analyze a single face image.
+        Returns the dominant emotion as a string, or None if analysis fails.
+        """
+        scores = self.get_emotions_batch([frame])
+        if not has_scores(scores):
+            return None
+        return EMOTION_LABELS[int(np.argmax(scores[0]))]
+
+
+def has_scores(scores):
+    """
+    Check whether a score vector (or the first row of a batch) holds real scores,
+    not None or the NaN row of a face the analyzer could not score.
+    """
+    return scores is not None and not np.isnan(scores[0] if np.ndim(scores) > 1 else scores).any()
+
+
+def register_analyzer(name, path):
+    """
+    Make an analyzer selectable by name.
+
+    Args:
+        name (str): Name used in the configuration
+        path (str): 'module:ClassName' of an EmotionAnalyzer subclass
+    """
+    ANALYZERS[name] = path
+
+
+def create_analyzer(name, **options):
+    """
+    Create an analyzer by its registered name.
+
+    Args:
+        name (str): Registered analyzer name, e.g. 'deepface' or 'onnx'
+        **options: Keyword arguments passed to the analyzer constructor
+
+    Returns:
+        EmotionAnalyzer: The analyzer instance (its model is loaded by load())
+
+    Raises:
+        ValueError: If no analyzer is registered under this name
+    """
+    if name not in ANALYZERS:
+        raise ValueError(f'Unknown emotion analyzer "{name}", available: {", ".join(sorted(ANALYZERS))}')
+
+    module_name, class_name = ANALYZERS[name].split(':')
+    analyzer_class = getattr(importlib.import_module(module_name), class_name)
+    return analyzer_class(**options)
@@ -0,0 +1,134 @@
+import asyncio
+from collections import Counter
+
+
+class EmotionBatcher:
+    """
+    A class that groups face crops coming from all client sessions into micro-batches,
+    so the emotion model runs one forward pass for many learners instead of one per frame.
+
+    A batch is flushed when it reaches max_batch_size or when the oldest crop in it
+    has waited batch_window_ms, whichever comes first.
+    """
+
+    def __init__(self, run_batch, batch_window_ms=20, max_batch_size=16):
+        """
+        Initialize the batcher.
+
+        Args:
+            run_batch: Coroutine function taking a list of face images and returning one
+                score vector per face (or None if the analysis failed)
+            batch_window_ms (float): Maximum time a crop waits for other crops to join its batch
+            max_batch_size (int): Maximum number of crops analyzed in one forward pass
+        """
+        self.run_batch = run_batch
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self.pending = []  # (sid, face_img, future) waiting for the next flush
+        self.flush_handle = None
+        self.running = set()  # Batch tasks in progress, kept referenced until done
+
+        self.batch_sizes = Counter()  # Batch size -> number of batches run with that size
+
+    async def analyze(self, sid, face_img):
+        """
+        Queue a face crop for the next batch and wait for its scores.
+
+        Args:
+            sid (str): Session the crop belongs to
+            face_img (numpy.ndarray): Face image in BGR format
+
+        Returns:
+            The score vector of this face, or None if the analysis failed
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((sid, face_img, future))
+
+        if len(self.pending) >= self.max_batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.batch_window, self.flush)
+
+        return await future
+
+    async def analyze_many(self, sid, faces):
+        """
+        Queue several face crops of one frame together, so they are analyzed in the same batch
+        (unless they do not all fit in what is left of the current one).
+
+        Args:
+            sid (str): Session the crops belong to
+            faces (list): Face images in BGR format
+
+        Returns:
+            list: The score vector of each face, None for faces whose analysis failed
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for face_img in faces:
+            future = loop.create_future()
+            self.pending.append((sid, face_img, future))
+            futures.append(future)
+            if len(self.pending) >= self.max_batch_size:
+                self.flush()
+
+        if self.pending and self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.batch_window, self.flush)
+
+        return list(await asyncio.gather(*futures))
+
+    def flush(self):
+        """
+        Start analyzing every pending crop as one batch.
+        """
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        task = asyncio.ensure_future(self.process_batch(batch))
+        self.running.add(task)
+        task.add_done_callback(self.running.discard)
+
+    async def process_batch(self, batch):
+        """
+        Run one forward pass over a batch and route each result back to its waiting session.
+        """
+        self.batch_sizes[len(batch)] += 1
+
+        try:
+            scores = await self.run_batch([face_img for _, face_img, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, _, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(None if scores is None else scores[i])
+
+    def stats(self):
+        """
+        Get the configured limits and the batch sizes actually achieved.
+
+        Returns:
+            dict: Batching configuration and statistics
+        """
+        batches = sum(self.batch_sizes.values())
+        frames = sum(size * count for size, count in self.batch_sizes.items())
+
+        return {
+            'batchWindowMs': self.batch_window * 1000,
+            'maxBatchSize': self.max_batch_size,
+            'batches': batches,
+            'frames': frames,
+            'meanBatchSize': frames / batches if batches else 0.0,
+            'largestBatch': max(self.batch_sizes, default=0),
+            'batchSizeHistogram': dict(sorted(self.batch_sizes.items()))
+        }
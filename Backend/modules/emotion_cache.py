@@ -0,0 +1,134 @@
+import time
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+
+class CacheEntry:
+    """
+    Last analyzed face crop of a session: its signature, its emotion scores and when it was analyzed.
+    """
+    def __init__(self, signature, scores, timestamp):
+        self.signature = signature
+        self.scores = scores
+        self.timestamp = timestamp
+
+
+class EmotionCache:
+    """
+    A class that reuses a session's last emotion scores while its face barely changes.
+
+    Each face crop is reduced to a small grayscale thumbnail (its signature). When the mean
+    absolute difference between a new signature and the one of the last analyzed crop is below
+    a threshold, and that analysis is recent enough, the previous scores are returned instead
+    of running the emotion model again.
+    """
+
+    def __init__(self, threshold=4.0, ttl=2.0, max_sessions=512, signature_size=16):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold (float): Maximum mean absolute gray level difference (0-255) between two
+                signatures for the cached scores to be reused, 0 disables the cache
+            ttl (float): Seconds after an analysis during which its scores may be reused
+            max_sessions (int): Maximum number of sessions kept, least recently used ones are evicted
+            signature_size (int): Side length in pixels of the signature thumbnail
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.signature_size = signature_size
+
+        self.entries = OrderedDict()  # sid -> CacheEntry, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, face_img):
+        """
+        Compute the perceptual signature of a face crop.
+
+        Args:
+            face_img (numpy.ndarray): Face image in BGR format
+
+        Returns:
+            numpy.ndarray: signature_size x signature_size grayscale thumbnail
+        """
+        gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+        thumbnail = cv2.resize(gray, (self.signature_size, self.signature_size), interpolation=cv2.INTER_AREA)
+        return thumbnail.astype(np.int16)
+
+    def lookup(self, sid, signature):
+        """
+        Get the cached scores of a session if its face has not changed meaningfully.
+
+        Args:
+            sid (str): Session the face belongs to
+            signature (numpy.ndarray): Signature of the new face crop
+
+        Returns:
+            The cached scores, or None on a cache miss
+        """
+        entry = self.entries.get(sid)
+
+        if (self.threshold > 0 and entry is not None
+                and time.monotonic() - entry.timestamp <= self.ttl
+                and np.abs(signature - entry.signature).mean() <= self.threshold):
+            self.hits += 1
+            self.entries.move_to_end(sid)
+            return entry.scores
+
+        self.misses += 1
+        return None
+
+    def latest(self, sid):
+        """
+        Get the last scores of a session whatever its face looks like now, e.g. to answer frames
+        the server has no capacity to analyze.
+
+        Returns:
+            The last scores stored for the session, or None if there are none
+        """
+        entry = self.entries.get(sid)
+        if entry is None:
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(sid)
+        return entry.scores
+
+    def store(self, sid, signature, scores):
+        """
+        Remember the scores of a freshly analyzed face crop.
+
+        Args:
+            sid (str): Session the face belongs to
+            signature (numpy.ndarray): Signature of the analyzed face crop
+            scores: Emotion scores returned by the analyzer
+        """
+        self.entries[sid] = CacheEntry(signature, scores, time.monotonic())
+        self.entries.move_to_end(sid)
+
+        while len(self.entries) > self.max_sessions:
+            self.entries.popitem(last=False)
+
+    def forget(self, sid):
+        """
+        Drop the cached scores of a session, e.g. when its client disconnects.
+        """
+        self.entries.pop(sid, None)
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Hits, misses, hit rate and number of sessions cached
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / lookups if lookups else 0.0,
+            'sessions': len(self.entries)
+        }
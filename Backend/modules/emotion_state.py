@@ -0,0 +1,120 @@
+import time
+import numpy as np
+from modules.emotion_analyzer import EMOTION_LABELS
+
+
+class SessionEmotionState:
+    """
+    Smoothed emotion state of a single session.
+    """
+    def __init__(self):
+        self.average = None  # Exponential moving average of the score vector
+        self.emotion = None  # Current dominant emotion, None while no face is visible
+        self.since = time.monotonic()  # When the current emotion started
+        self.last_emit = 0.0  # When the last state event was emitted
+
+
+class EmotionStateTracker:
+    """
+    A class that turns the noisy per-frame emotion scores of each session into a stable state.
+
+    Scores are smoothed with an exponential moving average, and the dominant emotion only
+    switches when another emotion's average exceeds the current one by a hysteresis margin.
+    The tracker also measures how long the current emotion has lasted, and decides when a
+    state event is worth sending: on every change, and otherwise at a low heartbeat rate.
+    """
+
+    def __init__(self, alpha=0.3, hysteresis=10.0, heartbeat=5.0):
+        """
+        Initialize the tracker.
+
+        Args:
+            alpha (float): Weight of the newest scores in the moving average (0-1)
+            hysteresis (float): Margin in percentage points another emotion's average must lead
+                the current emotion by before the dominant emotion switches
+            heartbeat (float): Seconds between state events while the state does not change
+        """
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.heartbeat = heartbeat
+        self.sessions = {}  # sid -> SessionEmotionState
+
+    def update(self, sid, scores):
+        """
+        Feed the scores of a new frame.
+
+        Args:
+            sid (str): Session the frame belongs to
+            scores (numpy.ndarray or None): Scores ordered as EMOTION_LABELS, None if no face was found
+
+        Returns:
+            dict or None: The state event to emit, None if nothing needs to be sent
+        """
+        now = time.monotonic()
+        state = self.sessions.setdefault(sid, SessionEmotionState())
+        previous = state.emotion
+
+        if scores is None:
+            # The face left the frame, start over when it comes back
+            state.average = None
+            state.emotion = None
+        else:
+            scores = np.asarray(scores, dtype=np.float32)
+            if state.average is None:
+                state.average = scores.copy()
+            else:
+                state.average += self.alpha * (scores - state.average)
+
+            candidate = int(np.argmax(state.average))
+            if state.emotion is None:
+                state.emotion = EMOTION_LABELS[candidate]
+            else:
+                current = EMOTION_LABELS.index(state.emotion)
+                if state.average[candidate] - state.average[current] >= self.hysteresis:
+                    state.emotion = EMOTION_LABELS[candidate]
+
+        changed = state.emotion != previous
+        if changed:
+            state.since = now
+        elif now - state.last_emit < self.heartbeat:
+            return None
+
+        state.last_emit = now
+        return self.event(state, now, changed)
+
+    def event(self, state, now, changed):
+        """
+        Build the compact state event of a session.
+        """
+        return {
+            'emotion': state.emotion,
+            'durationMs': int((now - state.since) * 1000),
+            'confidence': None if state.emotion is None
+                else round(float(state.average[EMOTION_LABELS.index(state.emotion)]), 1),
+            'changed': changed
+        }
+
+    def emotion(self, sid):
+        """
+        Get the current dominant emotion of a session, None if no face is visible.
+        """
+        state = self.sessions.get(sid)
+        return state.emotion if state is not None else None
+
+    def stable_for(self, sid):
+        """
+        Get how long the emotion state of a session has stayed the same.
+
+        Returns:
+            float or None: Seconds since the last state change, None if no face is visible
+        """
+        state = self.sessions.get(sid)
+        if state is None or state.emotion is None:
+            return None
+        return time.monotonic() - state.since
+
+    def forget(self, sid):
+        """
+        Drop the state of a session, e.g. when its client disconnects.
+        """
+        self.sessions.pop(sid, None)
@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from modules.emotion_analyzer import EMOTION_LABELS
+
+# Fixed-width columns of the store, one file per column: (dtype, shape of one row)
+COLUMNS = {
+    'time': (np.float64, ()),  # Unix timestamp of the frame, never decreasing
+    'session': (np.uint32, ()),  # Index of the session in the sessions table
+    'face': (np.uint8, ()),  # 1 if a face was visible
+    'scores': (np.uint8, (len(EMOTION_LABELS),))  # Scores ordered as EMOTION_LABELS, percent scaled to 0-255
+}
+
+# State of a row whose frame had no face, after the emotion indexes
+NO_FACE = len(EMOTION_LABELS)
+
+
+class EmotionTimeline:
+    """
+    A class that keeps the emotion scores of every analyzed frame of every session, on disk.
+
+    Rows are appended to fixed-width column files mapped in memory, 20 bytes per frame,
+    so recording a frame is one write per column with no serialization. Rows are in time
+    order, which lets range queries find their rows with a binary search instead of a scan.
+
+    Rows are appended from the event loop while queries and flushes may run on worker threads.
+    The sessions table is written by flush(), not on every new session, and reserve() extends the
+    column files ahead of the appends, so appending never waits on the disk.
+    """
+
+    def __init__(self, directory, grow_rows=65536, max_gap=5.0):
+        """
+        Open the store in a directory, creating it if needed.
+
+        Args:
+            directory (str): Directory holding the column files
+            grow_rows (int): Number of rows the column files are extended by, once fewer than half of them are free
+            max_gap (float): Longest time in seconds a frame is assumed to last in aggregates,
+                so pauses in a session's stream do not count as time spent in an emotion
+        """
+        self.directory = directory
+        self.grow_rows = grow_rows
+        self.max_gap = max_gap
+        os.makedirs(directory, exist_ok=True)
+
+        self.sessions = self.read_json('sessions.json', [])  # Session index -> session info
+        self.session_index = {session['id']: i for i, session in enumerate(self.sessions)}
+        self.lock = threading.Lock()  # Serializes flushes and remaps
+
+        self.columns = {}
+        self.capacity = 0
+        size = os.path.getsize(self.path('time')) if os.path.exists(self.path('time')) else 0
+        self.map(max(size // np.dtype(np.float64).itemsize, grow_rows))
+
+        # Rows written after the last flush are found by their non-zero timestamp
+        self.rows = min(self.read_json('meta.json', {}).get('rows', 0), self.capacity)
+        unwritten = np.flatnonzero(self.columns['time'][self.rows:] == 0)
+        self.rows += int(unwritten[0]) if len(unwritten) else self.capacity - self.rows
+
+        # Sessions started after the last flush are lost in a crash, their rows keep a placeholder
+        if self.rows:
+            for i in range(len(self.sessions), int(self.columns['session'][:self.rows].max()) + 1):
+                self.sessions.append({'id': f'unknown-{i}', 'started': None})
+                self.session_index[self.sessions[i]['id']] = i
+        self.saved_sessions = len(self.sessions)
+
+    def path(self, name):
+        return os.path.join(self.directory, f'{name}.bin')
+
+    def read_json(self, name, default):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return json.load(f)
+
+    def write_json(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+    def map(self, capacity):
+        """
+        Map every column file in memory with room for capacity rows, extending the files if needed.
+        Rows already written stay visible through the new maps, which share the pages of the old ones.
+        """
+        for name, (dtype, shape) in COLUMNS.items():
+            size = capacity * np.dtype(dtype).itemsize * int(np.prod(shape, dtype=int))
+            with open(self.path(name), 'ab') as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self.columns[name] = np.memmap(self.path(name), dtype=dtype, mode='r+', shape=(capacity,) + shape)
+        self.capacity = capacity
+
+    def reserve(self):
+        """
+        Extend the column files by grow_rows once fewer than half of that many rows are free.
+        This function blocks and is meant to run on a worker thread, before the appends fill the files.
+        """
+        with self.lock:
+            if self.capacity - self.rows < self.grow_rows // 2:
+                self.map(self.capacity + self.grow_rows)
+
+    def start_session(self, sid, **info):
+        """
+        Register a session, with optional information such as the learner it belongs to.
+
+        Returns:
+            int: Index of the session in the store
+        """
+        index = self.session_index.get(sid)
+        if index is None:
+            index = len(self.sessions)
+            self.sessions.append(dict(info, id=sid, started=time.time()))
+            self.session_index[sid] = index
+        return index
+
+    def append(self, sid, scores, timestamp=None):
+        """
+        Record the emotion scores of one frame of a session.
+
+        Args:
+            sid (str): Session the frame belongs to
+            scores (numpy.ndarray or None): Scores ordered as EMOTION_LABELS in percent, None if no face was found
+            timestamp (float): Unix time of the frame, now by default
+        """
+        if self.rows == self.capacity:
+            # Only when reserve() fell behind, e.g. without a background flush task
+            with self.lock:
+                if self.rows == self.capacity:
+                    self.map(self.capacity + self.grow_rows)
+
+        row = self.rows
+        previous = self.columns['time'][row - 1] if row else 0.0
+        # Keep the time column sorted even if the clock steps back, range queries rely on it
+        self.columns['time'][row] = max(time.time() if timestamp is None else timestamp, previous)
+        self.columns['session'][row] = self.start_session(sid)
+        if scores is None:
+            self.columns['face'][row] = 0
+            self.columns['scores'][row] = 0
+        else:
+            self.columns['face'][row] = 1
+            self.columns['scores'][row] = np.clip(np.rint(np.asarray(scores) * 2.55), 0, 255)
+        self.rows += 1
+
+    def flush(self):
+        """
+        Write the mapped columns, the new sessions and the metadata to disk.
+        """
+        with self.lock:
+            rows, sessions = self.rows, len(self.sessions)
+            for column in list(self.columns.values()):
+                column.flush()
+            if sessions > self.saved_sessions:
+                self.write_json('sessions.json', self.sessions[:sessions])
+                self.saved_sessions = sessions
+            self.write_json('meta.json', {'rows': rows, 'labels': EMOTION_LABELS})
+
+    def select(self, sid=None, start=None, end=None):
+        """
+        Get the rows of a time range, optionally of a single session.
+
+        Args:
+            sid (str): Session to select, None for every session
+            start (float): Unix time of the first frame to include, None for the beginning
+            end (float): Unix time of the last frame to include, None for the end
+
+        Returns:
+            dict: Column name -> numpy array of the selected rows
+        """
+        # Queries may run on a worker thread while frames are appended, they read the rows written so far
+        count, columns = self.rows, dict(self.columns)
+        times = columns['time'][:count]
+        lo = 0 if start is None else int(np.searchsorted(times, start, 'left'))
+        hi = count if end is None else int(np.searchsorted(times, end, 'right'))
+        rows = slice(lo, hi)
+
+        if sid is None:
+            return {name: np.asarray(column[rows]) for name, column in columns.items()}
+
+        index = self.session_index.get(sid)
+        mask = columns['session'][rows] == index if index is not None else np.zeros(hi - lo, dtype=bool)
+        return {name: np.asarray(column[rows][mask]) for name, column in columns.items()}
+
+    def frames(self, sid=None, start=None, end=None, limit=None):
+        """
+        Get the frames of a time range as lists, with scores back in percent.
+
+        Args:
+            limit (int): Largest number of frames returned, the first ones of the range, None for every frame
+
+        Returns:
+            dict: 'time', 'session' (session ids), 'face' and 'scores' lists, and 'truncated',
+                true if the range holds more frames than limit
+        """
+        rows = self.select(sid, start, end)
+        truncated = limit is not None and len(rows['time']) > limit
+        if truncated:
+            rows = {name: column[:limit] for name, column in rows.items()}
+        return {
+            'time': rows['time'].tolist(),
+            'session': [self.sessions[i]['id'] for i in rows['session'].tolist()],
+            'face': rows['face'].astype(bool).tolist(),
+            'scores': np.round(rows['scores'] / 2.55, 1).tolist(),
+            'truncated': truncated
+        }
+
+    def summary(self, sid=None, start=None, end=None):
+        """
+        Aggregate a time range, of one session or of every session together.
+
+        Each frame lasts until the next frame of its session (at most max_gap seconds) and counts
+        for its dominant emotion. Consecutive frames with the same dominant emotion form an episode,
+        whose length is the dwell time.
+
+        Returns:
+            dict: Frame and session counts, total duration, share of time per emotion (and without a face),
+                dwell time statistics per emotion and mean scores while a face was visible
+        """
+        rows = self.select(sid, start, end)
+        count = len(rows['time'])
+
+        # Group the frames by session, in time order within each session
+        order = np.lexsort((rows['time'], rows['session']))
+        times, sessions = rows['time'][order], rows['session'][order]
+        face, scores = rows['face'][order].astype(bool), rows['scores'][order]
+        states = np.where(face, np.argmax(scores, axis=1), NO_FACE) if count else np.zeros(0, dtype=int)
+
+        same_session = sessions[1:] == sessions[:-1]
+        durations = np.zeros(count)
+        if count > 1:
+            durations[:-1] = np.where(same_session, np.minimum(np.diff(times), self.max_gap), 0.0)
+
+        shares = np.bincount(states, weights=durations, minlength=NO_FACE + 1)
+        total = float(durations.sum())
+
+        # Episodes start at every change of session or of dominant emotion
+        starts = np.flatnonzero(np.r_[True, ~same_session | (states[1:] != states[:-1])]) if count else np.zeros(0, int)
+        episode_durations = np.add.reduceat(durations, starts) if count else np.zeros(0)
+        episode_states = states[starts]
+
+        dwell = {}
+        for i, label in enumerate(EMOTION_LABELS):
+            episodes = episode_durations[episode_states == i]
+            dwell[label] = {
+                'episodes': int(len(episodes)),
+                'meanSeconds': round(float(episodes.mean()), 3) if len(episodes) else 0.0,
+                'maxSeconds': round(float(episodes.max()), 3) if len(episodes) else 0.0
+            }
+
+        mean_scores = scores[face].mean(axis=0) / 2.55 if face.any() else np.zeros(len(EMOTION_LABELS))
+
+        return {
+            'frames': count,
+            'sessions': int(len(np.unique(sessions))),
+            'durationSeconds': round(total, 3),
+            'timeShare': {label: round(float(shares[i]) / total, 4) if total else 0.0
+                          for i, label in enumerate(EMOTION_LABELS)},
+            'noFaceShare': round(float(shares[NO_FACE]) / total, 4) if total else 0.0,
+            'dwell': dwell,
+            'meanScores': dict(zip(EMOTION_LABELS, np.round(mean_scores, 1).tolist()))
+        }
+
+    def summary_by_session(self, start=None, end=None):
+        """
+        Aggregate a time range separately for every session that has frames in it.
+
+        Returns:
+            dict: Session id -> summary
+        """
+        present = np.unique(self.select(start=start, end=end)['session'])
+        return {self.sessions[i]['id']: self.summary(self.sessions[i]['id'], start, end) for i in present.tolist()}
+
+    def close(self):
+        """
+        Flush the store and release the memory maps.
+        """
+        self.flush()
+        self.columns = {}
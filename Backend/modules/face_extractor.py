@@ -1,44 +1,153 @@
 import cv2
 
+class FaceTrack:
+    """
+    Last known face location of a session, used to search only around it on the next frame.
+    """
+    def __init__(self, box):
+        self.box = box  # (x, y, w, h) in detection image coordinates
+        self.frames_since_scan = 0  # Frames analyzed since the last full-frame detection
+
 class FaceExtractor:
-    def __init__(self):
+    def __init__(self, detection_width=None, face_size=(128, 128),
+                 tracking=False, full_scan_interval=10, roi_margin=0.5):
         """
         Initialize the face extractor with OpenCV's face detection cascade.
+
+        Args:
+            detection_width (int): If set, frames wider than this are downscaled to this width
+                before detection and the face box is mapped back to full resolution,
+                bounding detection cost regardless of the camera resolution
+            face_size (tuple): (width, height) every extracted face is resized to,
+                None to return the crop at its original size
+            tracking (bool): If True, frames of a session are searched only in a region around
+                the face found in its previous frame, instead of over the whole frame
+            full_scan_interval (int): Number of tracked frames after which a full-frame detection
+                is forced again, so a second face or a large movement is not missed for long
+            roi_margin (float): How far the search region extends beyond the last face box,
+                as a fraction of the box size on each side
         """
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 
-    def extract_face(self, frame):
+        self.detection_width = detection_width
+        self.face_size = tuple(face_size) if face_size else None
+
+        self.tracking = tracking
+        self.full_scan_interval = full_scan_interval
+        self.roi_margin = roi_margin
+
+        # session_id -> FaceTrack. Each session has at most one frame in flight,
+        # so a track is never updated by two threads at once.
+        self.tracks = {}
+        self.full_scans = 0
+        self.tracked_scans = 0
+
+    def extract_face(self, frame, session_id=None):
         """
-        Extract face from the frame and resize it to 128x128 pixels.
-        
+        Extract face from the frame and resize it to face_size (128x128 pixels by default).
+
         Args:
             frame: Input frame from camera
-            
+            session_id: Identifier of the video stream the frame belongs to; required for tracking
+
         Returns:
             tuple: (extracted_face, face_location) where:
-                - extracted_face: The face image resized to 128x128 pixels (None if no face detected)
-                - face_location: Dictionary with face coordinates (None if no face detected)
+                - extracted_face: The face image resized to face_size (None if no face detected)
+                - face_location: Dictionary with face coordinates in the full-resolution frame
+                  (None if no face detected)
         """
-        # Convert frame to grayscale for face detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Detect faces
+        gray, scale = self.prepare_detection_image(frame)
+
+        face = None
+        min_size = max(int(30 * scale), 24)  # 30px at full resolution, the cascade window is 24x24
+        track = self.tracks.get(session_id) if self.tracking and session_id is not None else None
+
+        # Search around the previous face first, fall back to the full frame if it was lost
+        if track is not None and track.frames_since_scan < self.full_scan_interval:
+            face = self.detect_in_region(gray, track.box, min_size)
+            if face is not None:
+                track.box = face
+                track.frames_since_scan += 1
+
+        if face is None:
+            face = self.detect_full_frame(gray, min_size)
+            if self.tracking and session_id is not None:
+                if face is None:
+                    self.tracks.pop(session_id, None)
+                else:
+                    self.tracks[session_id] = FaceTrack(face)
+
+        # If no faces detected, return None
+        if face is None:
+            return None, None
+
+        return self.crop_face(frame, face, scale)
+
+    def extract_faces(self, frame, max_faces=None):
+        """
+        Extract every face of the frame, for cameras shared by several learners.
+        Detection runs once over the whole frame; tracking does not apply.
+
+        Args:
+            frame: Input frame from camera
+            max_faces (int): If set, only the largest max_faces faces are kept
+
+        Returns:
+            list: (extracted_face, face_location) tuples as returned by extract_face,
+                largest face first (empty if no face detected)
+        """
+        gray, scale = self.prepare_detection_image(frame)
+        self.full_scans += 1
+
         faces = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=1.1,
             minNeighbors=5,
-            minSize=(30, 30)
+            minSize=(max(int(30 * scale), 24),) * 2
         )
-        
-        # If no faces detected, return None
-        if len(faces) == 0:
-            return None, None
 
-        # Get the first face (assuming we want the most prominent face)
-        x, y, w, h = faces[0]
+        faces = sorted((tuple(face) for face in faces), key=lambda f: f[2] * f[3], reverse=True)
+        if max_faces:
+            faces = faces[:max_faces]
+
+        return [self.crop_face(frame, face, scale) for face in faces]
+
+    def prepare_detection_image(self, frame):
+        """
+        Convert a frame to the grayscale image faces are detected in.
+
+        Returns:
+            tuple: (gray, scale) where scale maps full-resolution coordinates to detection image coordinates
+        """
+        # Convert frame to grayscale for face detection
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Detect on a downscaled copy, boxes are mapped back to full resolution by crop_face
+        scale = 1.0
+        if self.detection_width and gray.shape[1] > self.detection_width:
+            scale = self.detection_width / gray.shape[1]
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        return gray, scale
+
+    def crop_face(self, frame, face, scale):
+        """
+        Crop a detected face out of the full-resolution frame.
+
+        Args:
+            frame: Input frame from camera
+            face (tuple): (x, y, w, h) of the face in detection image coordinates
+            scale (float): Scale of the detection image relative to the frame
+
+        Returns:
+            tuple: (extracted_face, face_location) as returned by extract_face
+        """
+        x, y, w, h = (int(round(v / scale)) for v in face)
 
-        # Extract face ROI
+        # Extract face ROI and normalize its size for the emotion model
         face_img = frame[y:y+h, x:x+w]
+        if self.face_size is not None:
+            face_img = cv2.resize(face_img, self.face_size, interpolation=cv2.INTER_AREA)
 
         # Create face location dictionary
         face_location = {
@@ -48,4 +157,74 @@ class FaceExtractor:
             'height': int(h)
         }
 
-        return face_img, face_location
\ No newline at end of file
+        return face_img, face_location
+
+    def detect_full_frame(self, gray, min_size):
+        """
+        Run the cascade over the whole grayscale frame.
+
+        Returns:
+            tuple or None: (x, y, w, h) of the first detected face in detection image coordinates, None if no face was found
+        """
+        self.full_scans += 1
+
+        # Detect faces
+        faces = self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(min_size, min_size)
+        )
+
+        if len(faces) == 0:
+            return None
+
+        # Get the first face (assuming we want the most prominent face)
+        return tuple(faces[0])
+
+    def detect_in_region(self, gray, box, min_size):
+        """
+        Run the cascade only in a region around a previous face box.
+        The face is expected to keep roughly the same size, which also narrows the scales searched.
+
+        Returns:
+            tuple or None: (x, y, w, h) of the largest face in detection image coordinates, None if no face was found
+        """
+        self.tracked_scans += 1
+
+        x, y, w, h = box
+        margin_x, margin_y = int(w * self.roi_margin), int(h * self.roi_margin)
+        x0, y0 = max(x - margin_x, 0), max(y - margin_y, 0)
+        x1, y1 = min(x + w + margin_x, gray.shape[1]), min(y + h + margin_y, gray.shape[0])
+
+        faces = self.face_cascade.detectMultiScale(
+            gray[y0:y1, x0:x1],
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(max(int(w * 0.6), min_size), max(int(h * 0.6), min_size))
+        )
+
+        if len(faces) == 0:
+            return None
+
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        return fx + x0, fy + y0, fw, fh
+
+    def forget(self, session_id):
+        """
+        Drop the tracked face of a session, e.g. when its client disconnects.
+        """
+        self.tracks.pop(session_id, None)
+
+    def stats(self):
+        """
+        Get how many detections ran over the full frame versus only around a tracked face.
+
+        Returns:
+            dict: Detection counters
+        """
+        return {
+            'tracking': self.tracking,
+            'fullScans': self.full_scans,
+            'trackedScans': self.tracked_scans
+        }
@@ -0,0 +1,150 @@
+import threading
+import cv2
+import numpy as np
+
+# Face Mesh landmark indexes used for the geometric features
+# Eye contours in the order p1..p6 of the eye aspect ratio: corners p1/p4, upper lid p2/p3, lower lid p6/p5
+EYES = np.array([
+    [33, 160, 158, 133, 153, 144],  # Left eye (on the image's left side)
+    [362, 385, 387, 263, 373, 380]  # Right eye
+])
+MOUTH = np.array([78, 308, 13, 14])  # Left corner, right corner, upper lip, lower lip
+IRISES = np.array([468, 473])  # Iris centers, only present with refined landmarks
+NOSE_TIP = 1
+CHIN = 152
+FOREHEAD = 10
+CHEEKS = np.array([234, 454])  # Left and right edge of the face
+
+# Order of the values returned by engagement_features as a vector
+ENGAGEMENT_FEATURES = ['yaw', 'pitch', 'roll', 'eyeOpenness', 'mouthOpenness', 'gazeOffset']
+
+
+class FaceLandmarker:
+    """
+    A class that finds the MediaPipe Face Mesh landmarks of a face crop.
+
+    MediaPipe is imported when the model is loaded, so the server starts without it
+    unless the landmark gate is enabled. Each thread gets its own Face Mesh graph,
+    since a graph must not process two images at once.
+    """
+
+    def __init__(self, refine_landmarks=True, min_detection_confidence=0.5):
+        """
+        Args:
+            refine_landmarks (bool): Whether to add the iris landmarks used for gaze
+            min_detection_confidence (float): Minimum confidence threshold for face detection
+        """
+        self.refine_landmarks = refine_landmarks
+        self.min_detection_confidence = min_detection_confidence
+        self.mp_face_mesh = None
+        self.local = threading.local()
+
+    def load(self):
+        """
+        Import MediaPipe and build a Face Mesh graph for the calling thread.
+        """
+        if self.mp_face_mesh is None:
+            import mediapipe as mp
+            self.mp_face_mesh = mp.solutions.face_mesh
+        return self.face_mesh()
+
+    def face_mesh(self):
+        face_mesh = getattr(self.local, 'face_mesh', None)
+        if face_mesh is None:
+            # Crops of different sessions follow each other, so every image is processed on its own
+            face_mesh = self.mp_face_mesh.FaceMesh(
+                static_image_mode=True,
+                max_num_faces=1,
+                refine_landmarks=self.refine_landmarks,
+                min_detection_confidence=self.min_detection_confidence
+            )
+            self.local.face_mesh = face_mesh
+        return face_mesh
+
+    def landmarks(self, face_img):
+        """
+        Find the landmarks of a face crop.
+
+        Args:
+            face_img (numpy.ndarray): Face image in BGR format
+
+        Returns:
+            numpy.ndarray or None: (N, 2) landmark positions in pixels of the crop, None if no face was found
+        """
+        if self.mp_face_mesh is None:
+            self.load()
+
+        rgb = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
+        results = self.face_mesh().process(rgb)
+        if not results.multi_face_landmarks:
+            return None
+
+        points = np.array([(p.x, p.y) for p in results.multi_face_landmarks[0].landmark], dtype=np.float32)
+        return points * np.array([face_img.shape[1], face_img.shape[0]], dtype=np.float32)
+
+
+def engagement_features(points):
+    """
+    Compute geometric engagement signals from Face Mesh landmarks.
+
+    Args:
+        points (numpy.ndarray): (N, 2) landmark positions in pixels
+
+    Returns:
+        numpy.ndarray: Values ordered as ENGAGEMENT_FEATURES:
+            approximate yaw, pitch and roll of the head in degrees (yaw and roll are 0 when facing
+            the camera, pitch is offset by the face's proportions, so compare it over time),
+            eye openness (eye aspect ratio, about 0.3 open and below 0.15 closed),
+            mouth openness (lip gap over mouth width),
+            gaze offset (horizontal iris position in the eyes, -1 to 1, 0 when looking straight; 0 without irises)
+    """
+    # Eye aspect ratio of both eyes at once: (|p2-p6| + |p3-p5|) / (2 |p1-p4|)
+    eyes = points[EYES]  # (2 eyes, 6 points, 2)
+    lids = np.linalg.norm(eyes[:, [1, 2]] - eyes[:, [5, 4]], axis=2).sum(axis=1)
+    widths = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=1)
+    eye_openness = float(np.mean(lids / (2 * np.maximum(widths, 1e-6))))
+
+    left, right, upper, lower = points[MOUTH]
+    mouth_openness = float(np.linalg.norm(upper - lower) / max(np.linalg.norm(left - right), 1e-6))
+
+    # Head pose from where the nose tip sits between the face edges and between forehead and chin,
+    # and from the slope of the line through the outer eye corners
+    cheek_left, cheek_right = points[CHEEKS]
+    nose, chin, forehead = points[NOSE_TIP], points[CHIN], points[FOREHEAD]
+    face_width = max(np.linalg.norm(cheek_right - cheek_left), 1e-6)
+    face_height = max(np.linalg.norm(chin - forehead), 1e-6)
+    center_x = (cheek_left[0] + cheek_right[0]) / 2
+    horizontal = np.clip(2 * (nose[0] - center_x) / face_width, -1, 1)
+    vertical = np.clip(2 * (nose[1] - forehead[1]) / face_height - 1, -1, 1)
+    yaw, pitch = np.degrees(np.arcsin([horizontal, vertical]))
+    corner_left, corner_right = points[EYES[0, 0]], points[EYES[1, 3]]
+    roll = np.degrees(np.arctan2(corner_right[1] - corner_left[1], corner_right[0] - corner_left[0]))
+
+    # Iris position between the corners of each eye, averaged over both eyes
+    gaze_offset = 0.0
+    if len(points) > IRISES.max():
+        corners = eyes[:, [0, 3], 0]  # x of both corners of each eye
+        low, high = corners.min(axis=1), corners.max(axis=1)
+        position = (points[IRISES, 0] - low) / np.maximum(high - low, 1e-6)
+        gaze_offset = float(np.clip(np.mean(position) * 2 - 1, -1, 1))
+
+    return np.array([yaw, pitch, roll, eye_openness, mouth_openness, gaze_offset], dtype=np.float32)
+
+
+def engagement_payload(features, gaze_away_yaw=25.0, gaze_away_offset=0.35, eyes_closed=0.15):
+    """
+    Build the engagement part of a frame payload from a feature vector.
+
+    Args:
+        features (numpy.ndarray): Values ordered as ENGAGEMENT_FEATURES
+        gaze_away_yaw (float): Head yaw in degrees beyond which the learner looks away
+        gaze_away_offset (float): Gaze offset beyond which the learner looks away
+        eyes_closed (float): Eye openness below which the eyes count as closed
+
+    Returns:
+        dict: Rounded features plus 'gazeAway' and 'eyesClosed' flags
+    """
+    payload = dict(zip(ENGAGEMENT_FEATURES, np.round(features.astype(float), 2).tolist()))
+    payload['gazeAway'] = bool(abs(features[0]) > gaze_away_yaw or abs(features[5]) > gaze_away_offset)
+    payload['eyesClosed'] = bool(features[3] < eyes_closed)
+    return payload
@@ -0,0 +1,87 @@
+import threading
+import cv2
+import numpy as np
+
+# Smallest roll in degrees worth rotating a face crop for
+MIN_ALIGN_ANGLE = 5.0
+
+
+class FacePreprocessor:
+    """
+    A class that turns face crops into the input tensor of an emotion model in one pass:
+    grayscale, resized to the model input and normalized.
+
+    The crops come from FaceExtractor, so no face detection is run again. The tensor and the
+    intermediate images are written into buffers reused from one call to the next, so a frame
+    allocates nothing once the largest batch has been seen. Buffers are kept per thread, since
+    several inference workers may prepare batches at the same time.
+    """
+
+    def __init__(self, input_size=(48, 48), scale=1 / 255.0, mean=0.0, channels_first=False):
+        """
+        Args:
+            input_size (tuple): (width, height) of the model input
+            scale (float): Factor applied to the pixel values (after subtracting mean)
+            mean (float): Value subtracted from the pixel values
+            channels_first (bool): Whether the tensor is (N, 1, H, W) as ONNX models expect,
+                instead of (N, H, W, 1) as Keras models expect
+        """
+        self.input_size = tuple(input_size)
+        self.scale = scale
+        self.mean = mean
+        self.channels_first = channels_first
+        self.local = threading.local()
+
+    def buffers(self, count):
+        """
+        Get the buffers of the calling thread, growing the tensor to hold at least count faces.
+        """
+        width, height = self.input_size
+        local = self.local
+        if getattr(local, 'tensor', None) is None or len(local.tensor) < count:
+            local.tensor = np.empty((count, height, width), dtype=np.float32)
+            local.resized = np.empty((height, width, 3), dtype=np.uint8)
+            local.gray = np.empty((height, width), dtype=np.uint8)
+        return local
+
+    def prepare(self, faces):
+        """
+        Build the model input of a batch of face crops.
+
+        Args:
+            faces (list): Face images in BGR (or already grayscale) format
+
+        Returns:
+            numpy.ndarray: float32 tensor of len(faces) faces. It is a view of a reused buffer,
+                only valid until the next call from the same thread.
+        """
+        count = len(faces)
+        local = self.buffers(count)
+        tensor = local.tensor[:count]
+
+        for i, face in enumerate(faces):
+            # Shrinking first means the color conversion only runs on the small model-sized image
+            if face.ndim == 2:
+                cv2.resize(face, self.input_size, dst=local.gray, interpolation=cv2.INTER_AREA)
+            else:
+                cv2.resize(face, self.input_size, dst=local.resized, interpolation=cv2.INTER_AREA)
+                cv2.cvtColor(local.resized, cv2.COLOR_BGR2GRAY, dst=local.gray)
+            tensor[i] = local.gray
+
+        if self.mean:
+            tensor -= self.mean
+        if self.scale != 1:
+            tensor *= self.scale
+
+        return tensor[:, np.newaxis] if self.channels_first else tensor[..., np.newaxis]
+
+
+def align(face, angle):
+    """
+    Rotate a face crop around its center so a face rolled by angle degrees becomes upright.
+    Crops are aligned when they are extracted, with the roll measured on the Face Mesh landmarks,
+    so aligned faces are what the emotion cache and the analyzers see.
+    """
+    height, width = face.shape[:2]
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(face, rotation, (width, height), borderMode=cv2.BORDER_REPLICATE)
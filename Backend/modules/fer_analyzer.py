@@ -1,11 +1,26 @@
-from fer import FER
+from modules.emotion_analyzer import EmotionAnalyzer, EMOTION_LABELS
+import numpy as np
+import logging
 
-class FerAnalyzer:
+logger = logging.getLogger(__name__)
+
+class FerAnalyzer(EmotionAnalyzer):
     """
     A class that provides emotion analysis using the FER library.
     """
 
     def __init__(self):
+        self.detector = None
+
+    def load(self):
+        """
+        Import FER and create its detector. Does nothing if already loaded.
+        """
+        if self.detector is not None:
+            return
+
+        # Imported here so that importing this module does not load FER and its dependencies
+        from fer import FER
         self.detector = FER()
 
     def get_emotion(self, frame):
@@ -17,9 +32,34 @@ class FerAnalyzer:
             str: Dominant emotion or None
         """
         try:
+            self.load()
             emotion, score = self.detector.top_emotion(frame)
             
             return emotion or None
-        except Exception as e:
-            print(f"FER error: {str(e)}")
+        except Exception:
+            logger.exception('FER emotion analysis failed')
+            return None
+
+    def get_emotions_batch(self, faces):
+        """
+        Analyze already cropped faces using FER.
+        The whole image is passed as the face rectangle, so FER does not run its own detector.
+        Args:
+            faces: Face images in BGR format
+        Returns:
+            numpy.ndarray: Scores (in percent) ordered as EMOTION_LABELS, one row per face
+                (NaN where FER found no face in the crop), or None
+        """
+        try:
+            self.load()
+            scores = np.full((len(faces), len(EMOTION_LABELS)), np.nan, dtype=np.float32)
+            for i, face in enumerate(faces):
+                height, width = face.shape[:2]
+                results = self.detector.detect_emotions(face, face_rectangles=[(0, 0, width, height)])
+                if results:
+                    emotions = results[0]['emotions']
+                    scores[i] = [100 * emotions[label] for label in EMOTION_LABELS]
+            return scores
+        except Exception:
+            logger.exception('FER emotion analysis failed')
             return None
@@ -0,0 +1,94 @@
+import time
+
+
+class FrameRateController:
+    """
+    A class that decides how often each client should send frames.
+
+    A session whose emotion state just changed is sampled at the fastest rate, and the interval
+    grows the longer its state stays the same, up to the slowest rate when no face is visible.
+    The interval of every session is then stretched by the server load, so the total frame rate
+    drops on its own when the inference queue fills up at peak class sizes. Since clients may ignore
+    the requested interval, due() lets the server enforce a rate itself.
+    """
+
+    def __init__(self, min_interval_ms=500, max_interval_ms=3000, stable_after=10.0,
+                 load_factor=3.0, min_change=0.2):
+        """
+        Initialize the controller.
+
+        Args:
+            min_interval_ms (int): Interval of a session whose state is changing, on an idle server
+            max_interval_ms (int): Longest interval ever requested
+            stable_after (float): Seconds without a state change after which a session is fully stable
+                and gets max_interval_ms; the interval grows linearly until then
+            load_factor (float): How much a full inference queue multiplies the interval by, on top of 1
+            min_change (float): Relative change of the interval below which clients are not told,
+                so small load fluctuations do not cause a stream of control events
+        """
+        self.min_interval = min_interval_ms
+        self.max_interval = max_interval_ms
+        self.stable_after = stable_after
+        self.load_factor = load_factor
+        self.min_change = min_change
+        self.intervals = {}  # sid -> last interval sent to the client
+        self.analyzed_at = {}  # sid -> time the last frame allowed by due() was analyzed
+
+    def interval(self, stable_for, load):
+        """
+        Compute the frame interval of a session.
+
+        Args:
+            stable_for (float or None): Seconds since the session's emotion state last changed,
+                None if no face is visible
+            load (float): Server load, from 0 (idle) to 1 (inference queue full)
+
+        Returns:
+            int: Frame interval in milliseconds
+        """
+        if stable_for is None:
+            interval = self.max_interval
+        else:
+            stability = min(stable_for / self.stable_after, 1.0) if self.stable_after > 0 else 1.0
+            interval = self.min_interval + stability * (self.max_interval - self.min_interval)
+
+        interval *= 1 + self.load_factor * min(max(load, 0.0), 1.0)
+        return int(min(max(interval, self.min_interval), self.max_interval))
+
+    def update(self, sid, stable_for, load):
+        """
+        Compute the interval of a session after one of its frames was analyzed.
+
+        Returns:
+            int or None: The interval to send to the client, None if it did not change enough
+        """
+        interval = self.interval(stable_for, load)
+        previous = self.intervals.get(sid)
+        if previous is not None and abs(interval - previous) < self.min_change * previous:
+            return None
+
+        self.intervals[sid] = interval
+        return interval
+
+    def due(self, sid, interval_ms):
+        """
+        Check whether a frame of a session may be analyzed, at most once every interval_ms,
+        and if so count it as analyzed now.
+
+        Returns:
+            bool: True if the last analyzed frame of the session is at least interval_ms old
+        """
+        now = time.monotonic()
+        previous = self.analyzed_at.get(sid)
+        if previous is not None and (now - previous) * 1000 < interval_ms:
+            return False
+
+        self.analyzed_at[sid] = now
+        return True
+
+    def forget(self, sid):
+        """
+        Drop the interval of a session, e.g. when its client disconnects.
+        """
+        self.intervals.pop(sid, None)
+        self.analyzed_at.pop(sid, None)
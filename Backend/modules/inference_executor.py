@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceQueueFull(Exception):
+    """
+    Raised when the inference executor already holds as much work as its queue allows.
+    """
+
+
+class InferenceExecutor:
+    """
+    A class that runs blocking inference calls (OpenCV, TensorFlow) on a pool of worker threads.
+    Socket handlers await the result, so the asyncio event loop keeps serving other clients
+    while a frame is being analyzed.
+    """
+
+    def __init__(self, max_workers=2, max_queue_size=32):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers (int): Number of threads running inference concurrently
+            max_queue_size (int): Number of calls allowed to wait for a free worker
+        """
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+        self.pending = 0  # Calls currently running or waiting for a worker
+
+    @property
+    def capacity(self):
+        """
+        Maximum number of calls the executor holds at once (running plus queued).
+        """
+        return self.max_workers + self.max_queue_size
+
+    def is_full(self):
+        """
+        Check whether a new call would be rejected.
+
+        Returns:
+            bool: True if the queue is full, False otherwise
+        """
+        return self.pending >= self.capacity
+
+    async def run(self, func, *args):
+        """
+        Run a blocking function on a worker thread and wait for its result.
+
+        Args:
+            func: The blocking function to call
+            *args: Positional arguments passed to the function
+
+        Returns:
+            The return value of the function
+
+        Raises:
+            InferenceQueueFull: If the executor is already at capacity
+        """
+        if self.is_full():
+            raise InferenceQueueFull(f'Inference queue is full ({self.pending} pending)')
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        """
+        Stop the worker threads and drop every call that has not started yet.
+        """
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,315 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+import cv2
+from modules.emotion_analyzer import create_analyzer, EMOTION_LABELS
+
+logger = logging.getLogger(__name__)
+
+
+def worker_main(index, analyzer_name, analyzer_options, frames_name, scores_name, slots, slot_shape,
+                owners, tasks, results):
+    """
+    Entry point of an inference worker process.
+    Loads its own analyzer, then scores the batches written into the shared frame slots
+    and writes the scores into the shared score slots. Every batch gets a result, a failed one included,
+    and the worker records in owners which slot it is working on, so the server can tell
+    which batches were lost if the worker dies.
+    """
+    # Parallelism comes from the processes, one OpenCV thread each avoids oversubscribing the cores
+    cv2.setNumThreads(1)
+
+    analyzer = create_analyzer(analyzer_name, **analyzer_options)
+    analyzer.load()
+    analyzer.warm_up((slot_shape[2], slot_shape[1]))
+
+    frames_memory = SharedMemory(name=frames_name)
+    scores_memory = SharedMemory(name=scores_name)
+    frames = np.ndarray((slots,) + slot_shape, dtype=np.uint8, buffer=frames_memory.buf)
+    scores = np.ndarray((slots, slot_shape[0], len(EMOTION_LABELS)), dtype=np.float32, buffer=scores_memory.buf)
+
+    results.put(('ready', index))
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            slot, count, batch_id = task
+            owners[slot] = index
+            try:
+                # The faces are views into shared memory, nothing is copied or unpickled
+                batch_scores = analyzer.get_emotions_batch(list(frames[slot, :count]))
+                if batch_scores is not None:
+                    scores[slot, :count] = batch_scores
+            except Exception:
+                logger.exception('Inference worker %d failed to analyze a batch', index)
+                batch_scores = None
+            results.put((slot, batch_scores is not None, batch_id))
+    finally:
+        del frames, scores
+        frames_memory.close()
+        scores_memory.close()
+
+
+class InferenceProcessPool:
+    """
+    A class that runs emotion inference in separate worker processes, each holding its own model,
+    so analysis is not limited to the one core the server process can use.
+
+    Face crops are handed over through a ring of shared-memory slots instead of pickled arrays:
+    the server writes a batch into a free slot and only sends the slot index to a worker,
+    which writes the scores back into the matching shared score slot.
+
+    A worker that dies (e.g. killed for using too much memory) is restarted, and the batch it was
+    analyzing fails instead of waiting forever. A batch whose result takes longer than batch_timeout
+    also fails; its slot is only reused once the late result arrives, so a slow worker never writes
+    into a slot that holds another batch.
+    """
+
+    def __init__(self, analyzer_name, analyzer_options=None, workers=2, slots=None,
+                 max_batch_size=16, face_size=(128, 128), batch_timeout=30.0, check_interval=1.0):
+        """
+        Initialize the pool. Processes and shared memory are created by start().
+
+        Args:
+            analyzer_name (str): Registered name of the analyzer each worker loads
+            analyzer_options (dict): Keyword arguments of the analyzer constructor
+            workers (int): Number of worker processes
+            slots (int): Number of batches that can be in flight at once (default: twice the workers)
+            max_batch_size (int): Maximum number of faces in one batch
+            face_size (tuple): (width, height) of the face crops
+            batch_timeout (float): Seconds after which a batch without result fails
+            check_interval (float): Seconds between two checks that the workers are alive while a batch waits
+        """
+        self.analyzer_name = analyzer_name
+        self.analyzer_options = analyzer_options or {}
+        self.workers = workers
+        self.slots = slots or 2 * workers
+        self.slot_shape = (max_batch_size, face_size[1], face_size[0], 3)
+        self.batch_timeout = batch_timeout
+        self.check_interval = check_interval
+
+        self.processes = []
+        self.restarts = 0
+        self.abandoned = set()  # Slots of timed out or cancelled batches, freed when their result finally arrives
+        self.frames_memory = None
+        self.scores_memory = None
+        self.free_slots = asyncio.Queue()
+        self.futures = {}  # Slot -> future of the batch being analyzed in it
+        self.batches = {}  # Slot -> id of the batch sent to the workers whose result has not arrived yet
+        self.next_batch_id = 0
+        self.loop = None
+
+    def start(self, timeout=300):
+        """
+        Create the shared memory, start the worker processes and wait until every one
+        has loaded and warmed up its model. Blocks, meant to run during startup.
+
+        Raises RuntimeError, after stopping the workers and releasing the shared memory, if a worker
+        exits before it is ready (e.g. its model failed to load) or is not ready after timeout seconds.
+        """
+        self.ctx = ctx = mp.get_context('spawn')
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.owners = ctx.Array('i', [-1] * self.slots, lock=False)  # Slot -> index of the worker analyzing it
+
+        frames_size = self.slots * int(np.prod(self.slot_shape))
+        scores_size = self.slots * self.slot_shape[0] * len(EMOTION_LABELS) * np.dtype(np.float32).itemsize
+        self.frames_memory = SharedMemory(create=True, size=frames_size)
+        self.scores_memory = SharedMemory(create=True, size=scores_size)
+        self.frames = np.ndarray((self.slots,) + self.slot_shape, dtype=np.uint8, buffer=self.frames_memory.buf)
+        self.scores = np.ndarray((self.slots, self.slot_shape[0], len(EMOTION_LABELS)), dtype=np.float32,
+                                 buffer=self.scores_memory.buf)
+
+        self.processes = [self.start_worker(index) for index in range(self.workers)]
+
+        try:
+            self.wait_ready(timeout)
+        except Exception:
+            self.release()
+            raise
+
+        for slot in range(self.slots):
+            self.free_slots.put_nowait(slot)
+
+        self.reader = threading.Thread(target=self.read_results, name='inference-results', daemon=True)
+        self.reader.start()
+        logger.info('Started %d inference worker processes', self.workers)
+
+    def wait_ready(self, timeout):
+        """
+        Wait for the 'ready' message of every worker, checking meanwhile that none of them died.
+        """
+        ready = set()
+        deadline = time.monotonic() + timeout
+        while len(ready) < self.workers:
+            try:
+                message, index = self.results.get(timeout=self.check_interval)
+            except queue.Empty:
+                for index, process in enumerate(self.processes):
+                    if index not in ready and not process.is_alive():
+                        raise RuntimeError(f'Inference worker {index} exited with code {process.exitcode} '
+                                           'before loading its model')
+                if time.monotonic() > deadline:
+                    waiting = sorted(set(range(self.workers)) - ready)
+                    raise RuntimeError(f'Inference workers {waiting} not ready after {timeout:.0f} s')
+                continue
+
+            if message != 'ready':
+                raise RuntimeError(f'Unexpected message from inference worker: {message}')
+            ready.add(index)
+
+    def start_worker(self, index):
+        process = self.ctx.Process(
+            target=worker_main,
+            args=(index, self.analyzer_name, self.analyzer_options, self.frames_memory.name, self.scores_memory.name,
+                  self.slots, self.slot_shape, self.owners, self.tasks, self.results),
+            name=f'inference-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def read_results(self):
+        """
+        Wait for worker results on a background thread and hand them to the event loop.
+        """
+        while True:
+            result = self.results.get()
+            if result is None:
+                break
+            if result[0] == 'ready':
+                # A restarted worker finished loading its model
+                continue
+            self.loop.call_soon_threadsafe(self.resolve, *result)
+
+    def resolve(self, slot, success, batch_id):
+        if self.batches.get(slot) != batch_id:
+            # Result of a batch already failed because its worker was considered dead
+            return
+
+        del self.batches[slot]
+        self.owners[slot] = -1
+        if slot in self.abandoned:
+            # The late result of a timed out batch: nobody waits for it, the slot can be reused
+            self.abandoned.discard(slot)
+            self.free_slots.put_nowait(slot)
+            return
+
+        future = self.futures.get(slot)
+        if future is not None and not future.done():
+            future.set_result(success)
+
+    def check_workers(self):
+        """
+        Restart the workers that died, failing the batch each of them was analyzing.
+        """
+        for index, process in enumerate(self.processes):
+            if process.is_alive() or self.tasks is None:
+                continue
+
+            logger.error('Inference worker %d died (exit code %s), restarting it', index, process.exitcode)
+            self.restarts += 1
+            self.processes[index] = self.start_worker(index)
+            for slot, batch_id in list(self.batches.items()):
+                if self.owners[slot] == index:
+                    self.resolve(slot, False, batch_id)
+
+    async def run_batch(self, faces):
+        """
+        Analyze a batch of face crops on a worker process.
+
+        Args:
+            faces (list): Face images in BGR format, at most max_batch_size of them
+
+        Returns:
+            numpy.ndarray or None: Scores ordered as EMOTION_LABELS, one row per face, or None if analysis failed
+        """
+        self.loop = asyncio.get_running_loop()
+        slot = await self.free_slots.get()
+
+        try:
+            # Copy the crops straight into the shared slot, resizing any that do not have the slot size
+            height, width = self.slot_shape[1:3]
+            for i, face in enumerate(faces):
+                if face.shape[:2] == (height, width):
+                    self.frames[slot, i] = face
+                else:
+                    cv2.resize(face, (width, height), dst=self.frames[slot, i])
+
+            future = self.loop.create_future()
+            self.futures[slot] = future
+            self.next_batch_id += 1
+            self.batches[slot] = self.next_batch_id
+            self.tasks.put((slot, len(faces), self.next_batch_id))
+
+            # Wait for the result, checking meanwhile that the workers are still alive
+            deadline = time.monotonic() + self.batch_timeout
+            while not future.done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error('Inference batch timed out after %.0f s', self.batch_timeout)
+                    return None
+                await asyncio.wait({future}, timeout=min(self.check_interval, remaining))
+                if not future.done():
+                    self.check_workers()
+
+            if not future.result():
+                return None
+            return self.scores[slot, :len(faces)].copy()
+        finally:
+            self.futures.pop(slot, None)
+            if slot in self.batches:
+                # No result yet (timed out or cancelled): a worker may still write into the slot,
+                # so it is only reused once the result arrives
+                self.abandoned.add(slot)
+            else:
+                self.free_slots.put_nowait(slot)
+
+    @property
+    def pending(self):
+        """
+        Number of batches currently being analyzed.
+        """
+        return self.slots - self.free_slots.qsize()
+
+    def stop(self):
+        """
+        Stop the worker processes and release the shared memory.
+        """
+        if self.frames_memory is None:
+            return
+
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+        self.results.put(None)
+        self.reader.join(timeout=5)
+        self.release()
+
+    def release(self):
+        """
+        Terminate the workers still running, close the queues and release the shared memory.
+        """
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
+        self.tasks.close()
+        self.results.close()
+        self.tasks = self.results = None
+
+        del self.frames, self.scores
+        self.frames_memory.close()
+        self.frames_memory.unlink()
+        self.scores_memory.close()
+        self.scores_memory.unlink()
+        self.frames_memory = None
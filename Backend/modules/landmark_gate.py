@@ -0,0 +1,79 @@
+import time
+import numpy as np
+
+# Change of each engagement feature (ordered as ENGAGEMENT_FEATURES) considered meaningful:
+# yaw, pitch and roll in degrees, eye and mouth openness ratios, gaze offset
+DEFAULT_THRESHOLDS = (10.0, 10.0, 10.0, 0.08, 0.15, 0.3)
+
+
+class LandmarkGate:
+    """
+    A class that decides from cheap landmark geometry whether a face needs emotion inference again.
+
+    The engagement features of the last analyzed frame of each session are kept with its scores.
+    While no feature moves by more than its threshold, the face has not meaningfully changed
+    (same pose, eyes and mouth) and the previous scores are reused, until a refresh deadline
+    forces a new inference so slow expression changes are still picked up.
+    """
+
+    def __init__(self, thresholds=DEFAULT_THRESHOLDS, refresh_interval=3.0):
+        """
+        Initialize the gate.
+
+        Args:
+            thresholds (tuple): Change of each feature that triggers inference
+            refresh_interval (float): Maximum seconds between two inferences of a session
+        """
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+        self.refresh_interval = refresh_interval
+        self.entries = {}  # sid -> (features, scores, time of the inference)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, sid, features):
+        """
+        Get the previous scores of a session if its face geometry has not meaningfully changed.
+
+        Args:
+            sid (str): Session the face belongs to
+            features (numpy.ndarray): Engagement features of the new frame
+
+        Returns:
+            numpy.ndarray or None: The scores to reuse, None if inference is needed
+        """
+        entry = self.entries.get(sid)
+        if entry is not None:
+            previous, scores, analyzed_at = entry
+            if (time.monotonic() - analyzed_at < self.refresh_interval
+                    and np.all(np.abs(features - previous) < self.thresholds)):
+                self.hits += 1
+                return scores
+
+        self.misses += 1
+        return None
+
+    def store(self, sid, features, scores):
+        """
+        Remember the features and scores of a freshly analyzed face.
+        """
+        self.entries[sid] = (features, scores, time.monotonic())
+
+    def forget(self, sid):
+        """
+        Drop the entry of a session, e.g. when its client disconnects.
+        """
+        self.entries.pop(sid, None)
+
+    def stats(self):
+        """
+        Get how often inference was skipped.
+
+        Returns:
+            dict: Gate counters
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRate': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,146 @@
+import threading
+from bisect import bisect_left
+
+# Default histogram buckets in seconds, from 1 ms to 10 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """
+    A value that only goes up, such as the number of frames received.
+    It is either incremented directly or read from a function when rendered.
+    """
+    def __init__(self, func=None):
+        self.value = 0.0
+        self.func = func
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self.func() if self.func else self.value)]
+
+
+class Gauge:
+    """
+    A value that goes up and down, either set directly or read from a function when rendered.
+    """
+    def __init__(self, func=None):
+        self.value = 0.0
+        self.func = func
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        return [(name, labels, self.func() if self.func else self.value)]
+
+
+class Histogram:
+    """
+    Distribution of observed values (typically durations) over fixed buckets.
+    Observing costs one bisection and a few additions.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last slot counts values above every bucket
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name, labels):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append((f'{name}_bucket', labels + (('le', repr(bound)),), cumulative))
+        samples.append((f'{name}_bucket', labels + (('le', '+Inf'),), self.count))
+        samples.append((f'{name}_sum', labels, self.sum))
+        samples.append((f'{name}_count', labels, self.count))
+        return samples
+
+
+class MetricFamily:
+    """
+    A named metric with a help text, holding one metric per combination of label values.
+    """
+    def __init__(self, name, help, metric_type, factory, labelnames=()):
+        self.name = name
+        self.help = help
+        self.type = metric_type
+        self.factory = factory
+        self.labelnames = tuple(labelnames)
+        self.children = {}  # Label values -> metric
+        self.lock = threading.Lock()
+
+    def labels(self, *values):
+        """
+        Get the metric of a combination of label values, creating it on first use.
+        """
+        metric = self.children.get(values)
+        if metric is None:
+            with self.lock:
+                metric = self.children.setdefault(values, self.factory())
+        return metric
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for values, metric in list(self.children.items()):
+            for name, labels, value in metric.samples(self.name, tuple(zip(self.labelnames, values))):
+                label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A class that holds the server metrics and renders them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.families = []
+
+    def register(self, name, help, metric_type, factory, labelnames):
+        family = MetricFamily(name, help, metric_type, factory, labelnames)
+        self.families.append(family)
+        return family if labelnames else family.labels()
+
+    def counter(self, name, help, labelnames=(), func=None):
+        """
+        Create a counter, or a family of counters if label names are given.
+        A counter kept by another object can be exposed by passing a function returning its value.
+        """
+        return self.register(name, help, 'counter', lambda: Counter(func), labelnames)
+
+    def gauge(self, name, help, func=None):
+        """
+        Create a gauge, optionally reading its value from a function each time metrics are rendered.
+        """
+        return self.register(name, help, 'gauge', lambda: Gauge(func), ())
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Create a histogram, or a family of histograms if label names are given.
+        """
+        return self.register(name, help, 'histogram', lambda: Histogram(buckets), labelnames)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text
+        """
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
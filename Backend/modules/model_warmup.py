@@ -0,0 +1,59 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmup:
+    """
+    A class that runs the model loading and warm-up steps at server startup,
+    records how long each one takes and tells whether the server is ready for frames.
+    """
+
+    def __init__(self):
+        self.state = 'pending'  # pending -> warming_up -> ready, or error
+        self.timings = {}  # Step name -> duration in seconds
+        self.error = None
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def run(self, steps):
+        """
+        Run the warm-up steps in order. Blocks until all of them are done.
+
+        Args:
+            steps (list): (name, function) pairs, each function taking no arguments
+        """
+        self.state = 'warming_up'
+
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.state = 'error'
+                self.error = f'{name}: {e}'
+                logger.error('Warm-up step "%s" failed: %s', name, e)
+                return
+            self.timings[name] = time.perf_counter() - start
+            logger.info('Warm-up step "%s" took %.2fs', name, self.timings[name])
+
+        self.state = 'ready'
+
+    def status(self):
+        """
+        Get the readiness state and the duration of the steps completed so far.
+
+        Returns:
+            dict: Readiness status
+        """
+        status = {
+            'status': self.state,
+            'ready': self.ready,
+            'timings': {name: round(seconds, 3) for name, seconds in self.timings.items()}
+        }
+        if self.error:
+            status['error'] = self.error
+        return status
@@ -0,0 +1,106 @@
+from modules.emotion_analyzer import EmotionAnalyzer, EMOTION_LABELS
+from modules.face_preprocessor import FacePreprocessor
+import threading
+import numpy as np
+import cv2
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default model: FER+ emotion classifier from the ONNX model zoo (emotion-ferplus-8.onnx)
+# https://github.com/onnx/models/tree/main/validated/vision/body_analysis/emotion_ferplus
+# Input: 1x1x64x64 grayscale in [0, 255], output: 8 unnormalized scores in this order
+FERPLUS_LABELS = ['neutral', 'happy', 'surprise', 'sad', 'angry', 'disgust', 'fear', 'contempt']
+
+# Labels some models output that are not part of EMOTION_LABELS, folded into the closest one
+LABEL_ALIASES = {'contempt': 'disgust'}
+
+class OnnxEmotionAnalyzer(EmotionAnalyzer):
+    """
+    A class that runs a small ONNX emotion classifier on CPU through OpenCV's DNN module.
+    It needs neither TensorFlow nor any other dependency than OpenCV.
+
+    A cv2.dnn.Net must not run two inputs at once, so each inference thread reads its own copy
+    of the (small) model.
+    """
+
+    def __init__(self, model_path='models/emotion-ferplus-8.onnx', labels=FERPLUS_LABELS,
+                 input_size=(64, 64), scale=1.0, mean=0.0, softmax=True):
+        """
+        Initialize the analyzer. The model itself is read by load().
+
+        Args:
+            model_path (str): Path to the .onnx model
+            labels (list): Emotion label of each model output, in output order
+            input_size (tuple): (width, height) of the grayscale model input
+            scale (float): Factor applied to the pixel values (after subtracting mean)
+            mean (float): Value subtracted from the pixel values
+            softmax (bool): Whether the outputs are logits that need a softmax
+        """
+        self.model_path = model_path
+        self.input_size = tuple(input_size)
+        self.softmax = softmax
+        self.preprocessor = FacePreprocessor(self.input_size, scale=scale, mean=mean, channels_first=True)
+        self.local = threading.local()
+        self.supports_batch = True  # Cleared if the model only accepts one image per forward pass
+
+        # Matrix mapping the model outputs onto EMOTION_LABELS
+        self.projection = np.zeros((len(labels), len(EMOTION_LABELS)), dtype=np.float32)
+        for i, label in enumerate(labels):
+            self.projection[i, EMOTION_LABELS.index(LABEL_ALIASES.get(label, label))] = 1
+
+    def load(self):
+        """
+        Read the ONNX model for the calling thread. Does nothing if already loaded.
+        """
+        self.network()
+
+    def network(self):
+        net = getattr(self.local, 'net', None)
+        if net is None:
+            net = cv2.dnn.readNetFromONNX(self.model_path)
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+            self.local.net = net
+        return net
+
+    def forward(self, blob):
+        """
+        Run the network on a (N, 1, H, W) input, returning the raw outputs (one row per face).
+        """
+        net = self.network()
+        net.setInput(blob)
+        return net.forward().reshape(len(blob), -1)
+
+    def get_emotions_batch(self, faces):
+        """
+        Analyze already cropped faces with one forward pass.
+        Args:
+            faces: Face images in BGR format
+        Returns:
+            numpy.ndarray: Scores (in percent) ordered as EMOTION_LABELS, one row per face, or None
+        """
+        try:
+            self.load()
+            blob = self.preprocessor.prepare(faces)
+
+            if self.supports_batch:
+                try:
+                    outputs = self.forward(blob)
+                except cv2.error:
+                    # Models exported with a fixed batch size of 1 reject larger blobs
+                    if len(blob) == 1:
+                        raise
+                    self.supports_batch = False
+
+            if not self.supports_batch:
+                outputs = np.concatenate([self.forward(blob[i:i + 1]) for i in range(len(blob))])
+
+            if self.softmax:
+                outputs = np.exp(outputs - outputs.max(axis=1, keepdims=True))
+            probabilities = outputs / outputs.sum(axis=1, keepdims=True)
+
+            return 100 * probabilities @ self.projection
+        except Exception:
+            logger.exception('ONNX emotion analysis failed')
+            return None
@@ -0,0 +1,169 @@
+import os
+import sys
+import math
+import time
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    A class that samples the Python stacks of every thread of the server for a bounded capture.
+
+    While a capture runs, a background thread reads the current stack of every other thread
+    (event loop, inference workers, timeline flushes...) at a fixed interval, each stack rooted
+    at the name of its thread so they can be told apart. Nothing is hooked into the frame
+    pipeline, so there is no overhead at all when no capture is running. At the end of a capture
+    the samples are written as collapsed stacks (one 'frame;frame;frame count' line per stack,
+    the input format of flamegraph.pl, speedscope and similar tools) and as per-function stats.
+
+    Inference running in worker processes (process mode) is not sampled, only the dispatch to them.
+    """
+
+    def __init__(self, output_dir, interval=0.005, max_duration=300.0):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir (str): Directory the profiles are written to
+            interval (float): Seconds between two samples
+            max_duration (float): Longest capture allowed, in seconds, whatever was requested
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_duration = max_duration
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.last_profile = None  # Paths of the files written by the last capture
+
+    @property
+    def active(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration=None, frames=None, frame_count=None):
+        """
+        Start a capture in the background.
+
+        Args:
+            duration (float): Seconds to sample for, capped at max_duration, None for max_duration
+            frames (int): Stop once this many more frames were received (needs frame_count)
+            frame_count (callable): Returns the number of frames received so far
+
+        Returns:
+            bool: False if a capture is already running
+        """
+        if self.active:
+            return False
+        if duration is not None and not (math.isfinite(duration) and duration > 0):
+            raise ValueError(f'Invalid profile duration: {duration}')
+
+        duration = min(duration or self.max_duration, self.max_duration)
+        frame_limit = None
+        if frames and frame_count is not None:
+            start_count = frame_count()
+            frame_limit = lambda: frame_count() - start_count >= frames
+
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = time.time()
+        self.stop_event.clear()
+        self.thread = threading.Thread(
+            target=self.run, args=(duration, frame_limit), name='sampling-profiler', daemon=True)
+        self.thread.start()
+        logger.warning('Profiling started for up to %.0f s%s', duration, f' or {frames} frames' if frame_limit else '')
+        return True
+
+    def stop(self):
+        """
+        End the running capture early. Its profile is still written.
+        """
+        self.stop_event.set()
+
+    def run(self, duration, frame_limit):
+        deadline = time.monotonic() + duration
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            self.sample(own_id)
+            if time.monotonic() >= deadline or (frame_limit is not None and frame_limit()):
+                break
+
+        try:
+            self.last_profile = self.write()
+            logger.warning('Profiling finished: %d samples written to %s', self.samples, self.last_profile['collapsed'])
+        except OSError:
+            logger.exception('Could not write the profile')
+
+    def sample(self, own_id):
+        """
+        Record the current stack of every thread but the profiler's own.
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def write(self):
+        """
+        Write the collapsed stacks and the per-function stats of the capture.
+
+        Returns:
+            dict: Paths of the written files
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, time.strftime('profile-%Y%m%d-%H%M%S', time.localtime(self.started_at)))
+        paths = {'collapsed': base + '.collapsed', 'stats': base + '.stats.txt'}
+
+        with open(paths['collapsed'], 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(';'.join(stack) + f' {count}\n')
+
+        # Self samples count the function at the top of a stack, total samples every stack it appears in
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+
+        thread_samples = max(sum(self.stacks.values()), 1)
+        with open(paths['stats'], 'w') as f:
+            f.write(f'{self.samples} samples every {self.interval * 1000:.1f} ms over all threads\n')
+            f.write(f'{"self":>8} {"self%":>7} {"total":>8} {"total%":>7}  function\n')
+            for label, count in sorted(total.items(), key=lambda item: (own[item[0]], item[1]), reverse=True):
+                f.write(f'{own[label]:>8} {100 * own[label] / thread_samples:>6.2f}% '
+                        f'{count:>8} {100 * count / thread_samples:>6.2f}%  {label}\n')
+        return paths
+
+    def status(self):
+        """
+        Get the state of the profiler.
+
+        Returns:
+            dict: Whether a capture is running, its samples so far and the files of the last capture
+        """
+        return {
+            'active': self.active,
+            'samples': self.samples,
+            'startedAt': self.started_at,
+            'lastProfile': self.last_profile
+        }
+
+
+def frame_label(code):
+    """
+    Name a code object as 'function (file:line)'.
+    """
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
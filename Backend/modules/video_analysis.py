@@ -0,0 +1,138 @@
+import os
+import cv2
+import numpy as np
+import pandas as pd
+from modules.face_extractor import FaceExtractor
+from modules.emotion_analyzer import create_analyzer, has_scores, EMOTION_LABELS
+
+# Columns of the emotion timeline, one row per sampled frame
+TIMELINE_COLUMNS = ['frame', 'timestamp', 'face', 'x', 'y', 'width', 'height'] + EMOTION_LABELS + ['dominant']
+
+# Nullable integers keep the face box integral on frames without a face
+BOX_DTYPES = {'x': 'Int64', 'y': 'Int64', 'width': 'Int64', 'height': 'Int64'}
+
+# Face extractor and analyzer of the current worker process, created once by init_worker
+worker_state = {}
+
+
+def init_worker(analyzer_name, analyzer_options, detection_width, face_size):
+    """
+    Load the face extractor and emotion model of a worker process.
+    Runs once per process, so the model is not reloaded for every chunk.
+    """
+    cv2.setNumThreads(1)  # Parallelism comes from the processes
+    analyzer = create_analyzer(analyzer_name, **analyzer_options)
+    analyzer.load()
+    worker_state['extractor'] = FaceExtractor(detection_width=detection_width, face_size=face_size)
+    worker_state['analyzer'] = analyzer
+
+
+def video_info(path):
+    """
+    Read the frame count and frame rate of a video.
+
+    Returns:
+        tuple: (frame_count, fps)
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f'Cannot open video {path}')
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return frame_count, fps
+
+
+def split_chunks(frame_count, chunk_frames):
+    """
+    Split a video into consecutive (start, end) frame ranges of chunk_frames frames.
+    """
+    return [(start, min(start + chunk_frames, frame_count)) for start in range(0, frame_count, chunk_frames)]
+
+
+def analyze_chunk(path, start, end, stride, fps, batch_size=32):
+    """
+    Analyze every stride-th frame of a frame range of a video.
+    Runs in a worker process initialized by init_worker.
+
+    Args:
+        path (str): Video file
+        start (int): First frame of the chunk
+        end (int): Frame after the last frame of the chunk
+        stride (int): Analyze one frame out of this many, counted from the start of the video
+        fps (float): Frame rate of the video, to compute timestamps
+        batch_size (int): Number of faces analyzed per call of the emotion model
+
+    Returns:
+        pandas.DataFrame: Timeline rows of the sampled frames, with TIMELINE_COLUMNS
+    """
+    extractor = worker_state['extractor']
+    analyzer = worker_state['analyzer']
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    rows, faces, face_rows = [], [], []
+
+    def analyze_pending():
+        scores = analyzer.get_emotions_batch(faces) if faces else None
+        for i, row in enumerate(face_rows):
+            if scores is None:
+                continue
+            if not has_scores(scores[i]):
+                # The analyzer found no face in the crop
+                row[2] = False
+                continue
+            row[7:14] = scores[i]
+            row[14] = EMOTION_LABELS[int(np.argmax(scores[i]))]
+        faces.clear()
+        face_rows.clear()
+
+    # Align the first sampled frame on the stride, so chunk boundaries do not shift the sampling
+    first = start + (-start) % stride
+    for index in range(start, end):
+        # Skipped frames are only grabbed, not converted to images
+        if not cap.grab():
+            break
+        if index < first or (index - first) % stride:
+            continue
+
+        success, frame = cap.retrieve()
+        if not success:
+            continue
+
+        face_img, face_position = extractor.extract_face(frame)
+        row = [index, index / fps, face_img is not None, None, None, None, None] + [np.nan] * len(EMOTION_LABELS) + [None]
+        if face_img is not None:
+            row[3:7] = face_position['x'], face_position['y'], face_position['width'], face_position['height']
+            faces.append(face_img)
+            face_rows.append(row)
+            if len(faces) >= batch_size:
+                analyze_pending()
+        rows.append(row)
+
+    analyze_pending()
+    cap.release()
+    return pd.DataFrame(rows, columns=TIMELINE_COLUMNS).astype(BOX_DTYPES)
+
+
+def write_table(frame, path):
+    """
+    Write a timeline table as CSV or Parquet depending on the file extension.
+    The file is written next to its destination first, so an interrupted write never leaves a partial file.
+    """
+    temp_path = path + '.tmp'
+    if path.endswith('.parquet'):
+        frame.to_parquet(temp_path, index=False)  # Requires pyarrow or fastparquet
+    else:
+        frame.to_csv(temp_path, index=False)
+    os.replace(temp_path, path)
+
+
+def read_table(path):
+    """
+    Read a timeline table written by write_table.
+    """
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype=BOX_DTYPES)
@@ -4,87 +4,119 @@ os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0' # Disable oneDNN optimizations
 
 import cv2
 import threading
-from modules.camera import Camera
+import numpy as np
+import config
+from modules.camera import Camera, FpsMeter
 from modules.deep_face_analyzer import DeepFaceAnalyzer
 from modules.face_extractor import FaceExtractor
-from modules.fer_analyzer import FerAnalyzer
 
 # Global shared variables for thread-safe communication
 face_extractor = FaceExtractor()  # Handles face detection and extraction
 deep_face_analyzer = DeepFaceAnalyzer()  # Analyzes emotions using DeepFace
-fer_analyzer = FerAnalyzer()  # Analyzes emotions using FER
 
 face_location = None  # Stores current face position
 emotion = None  # Stores current detected emotion
+analysis_fps = FpsMeter()  # Rate at which frames are analyzed
 
 lock = threading.Lock()  # Thread synchronization lock
+running = threading.Event()  # Cleared to stop the analysis thread
 
-def analyze_face(frame):
+def analyze_faces(camera):
     """
-    Analyzes a frame to detect faces and emotions.
-    This function runs in a separate thread to avoid blocking the main video stream.
-    
+    Analyzes the newest camera frame for faces and emotions, over and over.
+    This function runs in one analysis thread for the whole session to avoid blocking the video stream,
+    always picking up the newest frame once the previous one is analyzed.
+
     Args:
-        frame: The video frame to analyze
+        camera: The threaded camera providing the frames
     """
     global face_location, emotion
+    frame_id = 0
 
-    # Extract face from the frame
-    face_img, face_position = face_extractor.extract_face(frame)
+    while running.is_set():
+        # Borrow the newest frame without copying it; the capture thread does not overwrite it
+        # until the face crop (a separate, resized image) has been extracted
+        with camera.latest_frame(newer_than=frame_id) as (frame_id, frame):
+            if frame is None:
+                continue
+            face_img, face_position = face_extractor.extract_face(frame)
 
-    if face_img is not None:
-        # If face is detected, analyze its emotion
-        emotion = deep_face_analyzer.get_emotion(face_img)
-        # emotion = fer_analyzer.get_emotion(face_img)
+        detected_emotion = None
+        if face_img is not None:
+            # If face is detected, analyze its emotion
+            detected_emotion = deep_face_analyzer.get_emotion(face_img)
 
+        # Values are reset if no face is detected
         with lock:
             face_location = face_position
-            emotion = emotion
-    else:
-        # Reset values if no face is detected
-        with lock:
-            face_location = None
-            emotion = None
+            emotion = detected_emotion
+
+        analysis_fps.tick()
+
+def draw_overlay(frame, camera):
+    """
+    Draw the face rectangle, the emotion and the capture and analysis rates on a frame.
+    """
+    # Draw face rectangle and emotion on the frame
+    red_color = (0, 0, 255)
+    with lock:
+        if face_location:
+            x, y = face_location['x'], face_location['y']
+            w, h = face_location['width'], face_location['height']
+            # Draw rectangle around detected face
+            cv2.rectangle(frame, (x, y), (x + w, y + h), red_color, 1)
+
+            # Display detected emotion above the face
+            if emotion:
+                cv2.putText(frame, emotion, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, red_color, 1)
+
+    # Display how fast frames are captured compared to how fast they are analyzed
+    cv2.putText(frame, f"capture {camera.capture_fps.fps:.1f} fps / analysis {analysis_fps.fps:.1f} fps",
+                (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, red_color, 1)
 
 def main():
     """
     Main function that handles video capture, face analysis, and display.
-    Uses threading to perform face analysis without blocking the video stream.
+    Frames are captured on the camera's own thread and analyzed on a single analysis thread,
+    so the display loop never waits on either.
     """
-    global face_location, emotion
-    camera = Camera()
-    analysis_thread = None
+    camera = Camera(
+        width=config.CAMERA_WIDTH,
+        height=config.CAMERA_HEIGHT,
+        fps=config.CAMERA_FPS,
+        fourcc=config.CAMERA_FOURCC,
+        threaded=True
+    )
+    print(f"Camera: {camera.stats()}")
+
+    running.set()
+    analysis_thread = threading.Thread(target=analyze_faces, args=(camera,), name='analysis', daemon=True)
+    analysis_thread.start()
+
+    frame = None  # Display buffer, overlays are drawn on it rather than on the shared camera buffers
+    frame_id = 0
 
     while camera.is_opened():
-        frame = camera.read_frame()
-        if frame is None:
-            continue
+        with camera.latest_frame(newer_than=frame_id) as (frame_id, latest):
+            new_frame = latest is not None
+            if new_frame:
+                if frame is None or frame.shape != latest.shape:
+                    frame = np.empty_like(latest)
+                np.copyto(frame, latest)
 
-        # Start background analysis if not running
-        if analysis_thread is None or not analysis_thread.is_alive():
-            analysis_thread = threading.Thread(target=analyze_face, args=(frame.copy(),))
-            analysis_thread.start()
+        if new_frame:
+            draw_overlay(frame, camera)
+            # Display the processed frame
+            cv2.imshow('Face Analysis', frame)
 
-        # Draw face rectangle and emotion on the frame
-        with lock:
-            if face_location:
-                x, y = face_location['x'], face_location['y']
-                w, h = face_location['width'], face_location['height']
-                red_color = (0, 0, 255)
-                # Draw rectangle around detected face
-                cv2.rectangle(frame, (x, y), (x + w, y + h), red_color, 1)
-                
-                # Display detected emotion above the face
-                if emotion:
-                    cv2.putText(frame, emotion, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, red_color, 1)
-
-        # Display the processed frame
-        cv2.imshow('Face Analysis', frame)
-        # Break loop if 'ESC' key is pressed
+        # Break loop if 'ESC' key is pressed. Runs even while the camera stalls,
+        # so the window keeps processing its events
         if cv2.waitKey(5) & 0xFF == 27:
             break
 
     # Clean up resources
+    running.clear()
+    analysis_thread.join(timeout=5)
     camera.release()
     cv2.destroyAllWindows()
 
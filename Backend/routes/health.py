@@ -0,0 +1,11 @@
+from routes.http_app import json_response
+from sockets.socket_manager import model_warmup
+
+
+def health(params=None, headers=None):
+    """
+    Report whether the models are loaded and warmed up.
+    Answers 200 once the server is ready for frames and 503 before that.
+    """
+    status = model_warmup.status()
+    return json_response(200 if status['ready'] else 503, status)
@@ -0,0 +1,60 @@
+import json
+import asyncio
+from urllib.parse import parse_qsl
+
+
+def json_response(status, body):
+    """
+    Build a route response with a JSON body.
+
+    Args:
+        status (int): HTTP status code
+        body: JSON serializable response body
+
+    Returns:
+        tuple: (status, content_type, body_bytes)
+    """
+    return status, 'application/json', json.dumps(body).encode('utf-8')
+
+
+def create_http_app(routes):
+    """
+    Create a minimal ASGI app serving plain HTTP routes next to the Socket.IO server.
+    Handlers are blocking functions, they run on the default executor of the event loop
+    so a slow query does not hold up the Socket.IO events.
+
+    Args:
+        routes (dict): Path -> handler taking the query parameters and the request headers (dicts, header names
+            in lowercase) and returning (status, content_type, body_bytes)
+
+    Returns:
+        The ASGI application
+    """
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+
+        handler = routes.get(scope['path'])
+        if handler is None:
+            status, content_type, body = 404, 'text/plain', b'Not Found'
+        elif scope.get('method') == 'OPTIONS':
+            # CORS preflight of browsers sending an Authorization header
+            status, content_type, body = 204, 'text/plain', b''
+        else:
+            params = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+            headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+            status, content_type, body = await asyncio.get_running_loop().run_in_executor(
+                None, handler, params, headers)
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type.encode('utf-8')),
+                (b'access-control-allow-origin', b'*'),
+                (b'access-control-allow-headers', b'Authorization')
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    return app
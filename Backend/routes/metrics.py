@@ -0,0 +1,8 @@
+from sockets.socket_manager import metrics_registry
+
+
+def metrics(params=None, headers=None):
+    """
+    Expose the frame pipeline metrics in the Prometheus text format.
+    """
+    return 200, 'text/plain; version=0.0.4', metrics_registry.render().encode('utf-8')
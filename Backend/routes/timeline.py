@@ -0,0 +1,88 @@
+import hmac
+import config
+from routes.http_app import json_response
+from sockets.socket_manager import emotion_timeline
+
+
+def authorized(headers):
+    """
+    Check the 'Authorization: Bearer <token>' header of a request against the admin token.
+    Always false without an admin token. The token is not taken from the query string,
+    which the access log writes out.
+    """
+    scheme, _, token = headers.get('authorization', '').partition(' ')
+    if not config.ADMIN_TOKEN or scheme.lower() != 'bearer':
+        return False
+    # Header values arrive as latin-1, encoding them back gives the raw bytes the client sent
+    return hmac.compare_digest(token.strip().encode('latin-1'), config.ADMIN_TOKEN.encode('utf-8'))
+
+
+def check_access(headers):
+    """
+    Get the error response of a request that cannot be served, None if it can.
+    """
+    if emotion_timeline is None:
+        return json_response(404, {'error': 'Emotion timeline disabled'})
+    if not authorized(headers):
+        return json_response(403, {'error': 'Unauthorized'})
+    return None
+
+
+def time_range(params):
+    """
+    Read the optional 'start' and 'end' Unix timestamps of a query.
+    """
+    return (float(params['start']) if 'start' in params else None,
+            float(params['end']) if 'end' in params else None)
+
+
+def timeline_sessions(params, headers):
+    """
+    List the sessions recorded in the emotion timeline. Like every timeline route,
+    it needs the admin token in an 'Authorization: Bearer' header.
+    """
+    error = check_access(headers)
+    if error is not None:
+        return error
+    return json_response(200, {'sessions': list(emotion_timeline.sessions), 'frames': emotion_timeline.rows})
+
+
+def timeline_summary(params, headers):
+    """
+    Aggregate the emotion timeline over a time range: per-emotion time share and dwell time,
+    of one session (?session=<id>), of every session together, or of each session (?bySession=true).
+    """
+    error = check_access(headers)
+    if error is not None:
+        return error
+    try:
+        start, end = time_range(params)
+    except ValueError:
+        return json_response(400, {'error': 'start and end must be Unix timestamps'})
+
+    if params.get('bySession', '').lower() == 'true':
+        return json_response(200, emotion_timeline.summary_by_session(start, end))
+    return json_response(200, emotion_timeline.summary(params.get('session'), start, end))
+
+
+def timeline_frames(params, headers):
+    """
+    Return the first recorded frames of a time range, optionally of one session (?session=<id>),
+    at most ?limit=<n> and never more than TIMELINE_MAX_FRAMES. 'truncated' tells whether frames were left out,
+    the next ones are read by starting the range at the last returned time.
+    """
+    error = check_access(headers)
+    if error is not None:
+        return error
+    try:
+        start, end = time_range(params)
+    except ValueError:
+        return json_response(400, {'error': 'start and end must be Unix timestamps'})
+    try:
+        limit = min(int(params.get('limit', config.TIMELINE_MAX_FRAMES)), config.TIMELINE_MAX_FRAMES)
+    except ValueError:
+        return json_response(400, {'error': 'limit must be an integer'})
+    if limit < 1:
+        return json_response(400, {'error': 'limit must be positive'})
+
+    return json_response(200, emotion_timeline.frames(params.get('session'), start, end, limit))
@@ -0,0 +1,122 @@
+class SessionFrames:
+    """
+    Frame bookkeeping for a single client session.
+    """
+
+    def __init__(self):
+        self.busy = False  # A frame of this session is being processed
+        self.pending = None  # Newest frame waiting for the one in flight to finish
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+
+
+class FrameCoalescer:
+    """
+    A class that applies latest-frame-wins backpressure per client session.
+
+    At most one frame per session is processed at a time. Frames arriving meanwhile
+    replace each other, so when processing finishes only the newest one is analyzed
+    and the older ones are dropped instead of piling up.
+    """
+
+    def __init__(self):
+        self.sessions = {}  # sid -> SessionFrames
+        self.total_dropped = 0  # Frames dropped over all sessions, including disconnected ones
+        self.in_flight = 0  # Sessions with a frame being processed, i.e. frames in flight over all sessions
+
+    def offer(self, sid, data):
+        """
+        Register an incoming frame.
+
+        Args:
+            sid (str): Session the frame belongs to
+            data: The frame data, handed back unchanged by next()
+
+        Returns:
+            bool: True if the caller should process the frame now, False if it was
+                queued behind the frame already in flight
+        """
+        session = self.sessions.setdefault(sid, SessionFrames())
+        session.received += 1
+
+        if not session.busy:
+            session.busy = True
+            self.in_flight += 1
+            return True
+
+        if session.pending is not None:
+            session.dropped += 1
+            self.total_dropped += 1
+        session.pending = data
+        return False
+
+    def next(self, sid):
+        """
+        Mark the frame in flight as processed and take the newest queued frame, if any.
+
+        Args:
+            sid (str): Session whose frame finished processing
+
+        Returns:
+            The next frame data to process, or None if the session is now idle
+        """
+        session = self.sessions.get(sid)
+        if session is None:
+            return None
+
+        session.processed += 1
+
+        data, session.pending = session.pending, None
+        if data is None:
+            session.busy = False
+            self.in_flight -= 1
+        return data
+
+    def remove(self, sid):
+        """
+        Forget a session, dropping its queued frame.
+
+        Args:
+            sid (str): Session to remove
+
+        Returns:
+            dict or None: Final statistics of the session, None if it never sent a frame
+        """
+        session = self.sessions.pop(sid, None)
+        if session is None:
+            return None
+
+        if session.pending is not None:
+            session.dropped += 1
+            self.total_dropped += 1
+        if session.busy:
+            self.in_flight -= 1
+        return self.session_stats(session)
+
+    def is_busy(self, sid):
+        """
+        Check whether a frame of a session is being processed.
+        """
+        session = self.sessions.get(sid)
+        return session is not None and session.busy
+
+    def stats(self, sid):
+        """
+        Get the frame counters of a session.
+
+        Args:
+            sid (str): Session to report on
+
+        Returns:
+            dict: Received, processed and dropped frame counts
+        """
+        return self.session_stats(self.sessions.get(sid, SessionFrames()))
+
+    @staticmethod
+    def session_stats(session):
+        return {
+            'received': session.received,
+            'processed': session.processed,
+            'dropped': session.dropped
+        }
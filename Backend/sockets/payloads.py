@@ -0,0 +1,119 @@
+import numpy as np
+from modules.emotion_analyzer import EMOTION_LABELS
+
+# 'frame_received' payload formats
+#
+# Legacy (default, used by the current frontend):
+#   {'hasDetectedFace': 'true', 'emotions': {'angry': 0.12, ..., 'neutral': 80.3}}
+#
+# Compact, for clients connecting with the auth option {'protocol': 2} (optionally 'quantize': true):
+#   {'v': 2, 'seq': 42, 'face': true, 'box': [x, y, width, height], 'scores': [0.12, ..., 80.3]}
+#   scores follow the order of EMOTION_LABELS, in percent, or as integers 0-255 when quantized.
+#
+# With the landmark gate enabled, both formats also carry the geometric engagement features of the face:
+#   'engagement': {'yaw': 3.1, 'pitch': 6.4, 'roll': -1.2, 'eyeOpenness': 0.31, 'mouthOpenness': 0.05,
+#                  'gazeOffset': 0.1, 'gazeAway': false, 'eyesClosed': false}
+#
+# Multi-face, for clients connecting with the auth option {'multiFace': true}, every face
+# largest first, in either format:
+#   {'hasDetectedFace': 'true', 'emotions': {...largest face...},
+#    'faces': [{'x': 10, 'y': 20, 'width': 80, 'height': 80, 'emotions': {...}}, ...]}
+#   {'v': 2, 'seq': 42, 'face': true, 'faces': [{'box': [x, y, width, height], 'scores': [...]}, ...]}
+COMPACT_PROTOCOL = 2
+
+
+def build_frame_result(options, seq, face_position, scores, engagement=None):
+    """
+    Build the 'frame_received' payload of an analyzed frame in the format the client asked for.
+
+    Args:
+        options (dict): Options the client sent when connecting
+        seq (int): Sequence number of the frame
+        face_position (dict or None): Face location, None if no face was detected
+        scores (numpy.ndarray or None): Scores ordered as EMOTION_LABELS, None if unavailable
+        engagement (dict or None): Geometric engagement features of the face, None if not computed
+
+    Returns:
+        dict: The payload
+    """
+    if options.get('protocol') == COMPACT_PROTOCOL:
+        payload = build_compact_result(seq, face_position, scores, options.get('quantize', False))
+    else:
+        payload = build_legacy_result(face_position, scores)
+
+    if engagement is not None:
+        payload['engagement'] = engagement
+    return payload
+
+
+def build_multi_face_result(options, seq, face_positions, face_scores):
+    """
+    Build the 'frame_received' payload of a frame analyzed in multi-face mode.
+
+    Args:
+        options (dict): Options the client sent when connecting
+        seq (int): Sequence number of the frame
+        face_positions (list): Location of every detected face, empty if no face was detected
+        face_scores (list): Scores of each face ordered as EMOTION_LABELS, None where unavailable
+
+    Returns:
+        dict: The payload
+    """
+    if options.get('protocol') == COMPACT_PROTOCOL:
+        quantize = options.get('quantize', False)
+        faces = []
+        for face_position, scores in zip(face_positions, face_scores):
+            face = build_compact_result(seq, face_position, scores, quantize)
+            faces.append({key: face[key] for key in ('box', 'scores') if key in face})
+        return {'v': COMPACT_PROTOCOL, 'seq': seq, 'face': bool(faces), 'faces': faces}
+
+    if not face_positions:
+        return {'hasDetectedFace': 'false', 'faces': []}
+
+    faces = [dict(face_position, emotions=build_legacy_result(face_position, scores)['emotions'])
+             for face_position, scores in zip(face_positions, face_scores)]
+    # The top-level emotions are those of the largest face, so single-face clients keep working
+    return {'hasDetectedFace': 'true', 'emotions': faces[0]['emotions'], 'faces': faces}
+
+
+def build_frame_error(options, seq, error):
+    """
+    Build the 'frame_received' payload of a frame that could not be analyzed.
+    """
+    if options.get('protocol') == COMPACT_PROTOCOL:
+        return {'v': COMPACT_PROTOCOL, 'seq': seq, 'face': False, 'error': error}
+    return {'hasDetectedFace': 'false', 'error': error}
+
+
+def build_legacy_result(face_position, scores):
+    """
+    Build the legacy payload: string booleans and a dictionary of emotion scores.
+    """
+    if face_position is None:
+        return {'hasDetectedFace': 'false'}
+
+    return {
+        'hasDetectedFace': 'true',
+        # One tolist() call converts the whole vector to native floats
+        'emotions': None if scores is None else dict(zip(EMOTION_LABELS, np.asarray(scores).tolist()))
+    }
+
+
+def build_compact_result(seq, face_position, scores, quantize=False):
+    """
+    Build the compact payload: a real boolean, the face box and a fixed-order score array.
+    """
+    payload = {'v': COMPACT_PROTOCOL, 'seq': seq, 'face': face_position is not None}
+
+    if face_position is not None:
+        payload['box'] = [face_position['x'], face_position['y'], face_position['width'], face_position['height']]
+
+    if scores is not None:
+        # Rounded as float64, so the values serialize as short decimals (float32 80.3 would be 80.30000305175781)
+        scores = np.asarray(scores, dtype=np.float64)
+        if quantize:
+            payload['scores'] = np.clip(np.rint(scores * 2.55), 0, 255).astype(np.uint8).tolist()
+        else:
+            payload['scores'] = np.round(scores, 2).tolist()
+
+    return payload
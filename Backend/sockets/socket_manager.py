@@ -1,81 +1,803 @@
 from socketio import AsyncServer
+from socketio.exceptions import ConnectionRefusedError
 from modules.face_extractor import FaceExtractor
-from modules.deep_face_analyzer import DeepFaceAnalyzer
+from modules.emotion_analyzer import create_analyzer, has_scores
+from modules.emotion_batcher import EmotionBatcher
+from modules.class_aggregator import ClassAggregator
+from modules.emotion_cache import EmotionCache
+from modules.emotion_state import EmotionStateTracker
+from modules.emotion_timeline import EmotionTimeline
+from modules.face_landmarks import FaceLandmarker, ENGAGEMENT_FEATURES, engagement_features, engagement_payload
+from modules.face_preprocessor import MIN_ALIGN_ANGLE, align
+from modules.landmark_gate import LandmarkGate
+from modules.degradation import DegradationController, TIERS, REDUCED_RATE, FALLBACK_ANALYZER, DETECTION_ONLY
+from modules.frame_rate_controller import FrameRateController
+from modules.inference_executor import InferenceExecutor, InferenceQueueFull
+from modules.inference_process_pool import InferenceProcessPool
+from modules.metrics import MetricsRegistry
+from modules.model_warmup import ModelWarmup
+from modules.sampling_profiler import SamplingProfiler
+from sockets.frame_coalescer import FrameCoalescer
+from sockets.payloads import build_frame_result, build_multi_face_result, build_frame_error
+import config
+import asyncio
+import hmac
+import logging
+import math
+import signal
+import threading
+import time
 import base64
 import numpy as np
 import cv2
 
-# Recursive function to convert numpy types to native Python types
-def make_json_serializable(obj):
-    if isinstance(obj, dict):
-        return {k: make_json_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [make_json_serializable(v) for v in obj]
-    elif isinstance(obj, np.generic):
-        return obj.item()
-    else:
-        return obj
+logger = logging.getLogger(__name__)
+
+MAX_CLASS_ID_LENGTH = 64  # Longest classId accepted from a client
 
 # Create an instance of AsyncServer
 sio = AsyncServer(async_mode='asgi', cors_allowed_origins='*')
 
 # Create global instances
-face_extractor = FaceExtractor()
-deep_face_analyzer = DeepFaceAnalyzer()
+face_extractor = FaceExtractor(
+    detection_width=config.DETECTION_WIDTH,
+    face_size=(config.FACE_CROP_SIZE, config.FACE_CROP_SIZE),
+    tracking=config.FACE_TRACKING,
+    full_scan_interval=config.FACE_FULL_SCAN_INTERVAL,
+    roi_margin=config.FACE_TRACKING_MARGIN
+)
+emotion_analyzer = create_analyzer(
+    config.EMOTION_ANALYZER,
+    **config.ANALYZER_OPTIONS.get(config.EMOTION_ANALYZER, {})
+)
+inference_executor = InferenceExecutor(
+    max_workers=config.INFERENCE_WORKERS,
+    max_queue_size=config.INFERENCE_QUEUE_SIZE
+)
+
+def analyze_batch(faces):
+    """
+    Analyze a batch of face crops, recording the inference time and batch size.
+    This function blocks and is meant to run on an inference worker thread.
+    """
+    start = time.perf_counter()
+    scores = emotion_analyzer.get_emotions_batch(faces)
+    stage_duration.labels('inference').observe(time.perf_counter() - start)
+    batch_size.observe(len(faces))
+    return scores
+
+async def run_emotion_batch(faces):
+    """
+    Analyze a batch of face crops on an inference worker.
+    """
+    return await inference_executor.run(analyze_batch, faces)
+
+# In 'process' mode the emotion model lives only in the worker processes,
+# the server process keeps face detection and dispatches batches to them
+inference_pool = None
+if config.INFERENCE_MODE == 'process':
+    inference_pool = InferenceProcessPool(
+        config.EMOTION_ANALYZER,
+        config.ANALYZER_OPTIONS.get(config.EMOTION_ANALYZER, {}),
+        workers=config.INFERENCE_PROCESSES,
+        max_batch_size=config.BATCH_MAX_SIZE,
+        face_size=(config.FACE_CROP_SIZE, config.FACE_CROP_SIZE),
+        batch_timeout=config.INFERENCE_BATCH_TIMEOUT
+    )
+
+    async def run_emotion_batch(faces):
+        """
+        Analyze a batch of face crops on an inference worker process.
+        """
+        start = time.perf_counter()
+        scores = await inference_pool.run_batch(faces)
+        stage_duration.labels('inference').observe(time.perf_counter() - start)
+        batch_size.observe(len(faces))
+        return scores
+
+emotion_batcher = EmotionBatcher(
+    run_emotion_batch,
+    batch_window_ms=config.BATCH_WINDOW_MS,
+    max_batch_size=config.BATCH_MAX_SIZE
+)
+
+# Cheaper analyzer used instead of the main one in the fallback tier, always on worker threads
+fallback_analyzer = None
+if config.FALLBACK_ANALYZER and config.FALLBACK_ANALYZER != config.EMOTION_ANALYZER:
+    fallback_analyzer = create_analyzer(
+        config.FALLBACK_ANALYZER,
+        **config.ANALYZER_OPTIONS.get(config.FALLBACK_ANALYZER, {})
+    )
+
+def analyze_fallback_batch(faces):
+    """
+    Analyze a batch of face crops with the fallback analyzer.
+    This function blocks and is meant to run on an inference worker thread.
+    """
+    start = time.perf_counter()
+    scores = fallback_analyzer.get_emotions_batch(faces)
+    stage_duration.labels('fallback_inference').observe(time.perf_counter() - start)
+    return scores
+
+async def run_fallback_batch(faces):
+    """
+    Analyze a batch of face crops with the fallback analyzer on an inference worker.
+    """
+    return await inference_executor.run(analyze_fallback_batch, faces)
+
+fallback_batcher = EmotionBatcher(
+    run_fallback_batch,
+    batch_window_ms=config.BATCH_WINDOW_MS,
+    max_batch_size=config.BATCH_MAX_SIZE
+)
+degradation = DegradationController(
+    thresholds=config.DEGRADATION_THRESHOLDS,
+    min_dwell=config.DEGRADATION_MIN_DWELL,
+    skip_tiers=() if fallback_analyzer is not None else (FALLBACK_ANALYZER,)
+)
+emotion_cache = EmotionCache(
+    threshold=config.EMOTION_CACHE_THRESHOLD,
+    ttl=config.EMOTION_CACHE_TTL,
+    max_sessions=config.EMOTION_CACHE_MAX_SESSIONS
+)
+face_landmarker = FaceLandmarker() if config.LANDMARK_GATE else None
+landmark_gate = LandmarkGate(refresh_interval=config.LANDMARK_REFRESH_INTERVAL)
+emotion_state_tracker = EmotionStateTracker(
+    alpha=config.EMOTION_EMA_ALPHA,
+    hysteresis=config.EMOTION_HYSTERESIS,
+    heartbeat=config.EMOTION_STATE_HEARTBEAT
+)
+emotion_timeline = EmotionTimeline(config.EMOTION_TIMELINE_DIR) if config.EMOTION_TIMELINE_DIR else None
+frame_rate_controller = FrameRateController(
+    min_interval_ms=config.FRAME_INTERVAL_MIN_MS,
+    max_interval_ms=config.FRAME_INTERVAL_MAX_MS,
+    stable_after=config.FRAME_INTERVAL_STABLE_AFTER
+)
+frame_coalescer = FrameCoalescer()
+class_aggregator = ClassAggregator()
+session_options = {}  # sid -> options sent by the client when connecting
+session_tiers = {}  # sid -> service tier the client was last told about
+dashboards = {}  # sid -> class id of each connected instructor dashboard
+model_warmup = ModelWarmup()
+profiler = SamplingProfiler(
+    config.PROFILE_DIR,
+    interval=config.PROFILE_INTERVAL_MS / 1000,
+    max_duration=config.PROFILE_MAX_SECONDS
+)
+background_tasks = set()  # Keeps background tasks referenced until they finish
+
+# Metrics exposed on the /metrics route
+metrics_registry = MetricsRegistry()
+stage_duration = metrics_registry.histogram(
+    'eduface_stage_duration_seconds', 'Time spent in each stage of the frame pipeline', labelnames=('stage',))
+batch_size = metrics_registry.histogram(
+    'eduface_inference_batch_size', 'Number of faces per emotion inference batch', buckets=(1, 2, 4, 8, 16, 32, 64))
+frames_total = metrics_registry.counter('eduface_frames_total', 'Frames received')
+faces_total = metrics_registry.counter('eduface_faces_detected_total', 'Frames in which a face was detected')
+frame_errors_total = metrics_registry.counter(
+    'eduface_frame_errors_total', 'Frames that could not be analyzed', labelnames=('reason',))
+metrics_registry.counter(
+    'eduface_frames_dropped_total', 'Frames replaced by a newer frame of the same session',
+    func=lambda: frame_coalescer.total_dropped)
+metrics_registry.counter(
+    'eduface_emotion_cache_hits_total', 'Frames answered from the emotion cache', func=lambda: emotion_cache.hits)
+metrics_registry.counter(
+    'eduface_emotion_cache_misses_total', 'Frames that needed emotion inference', func=lambda: emotion_cache.misses)
+sessions_rejected_total = metrics_registry.counter(
+    'eduface_sessions_rejected_total', 'Connections refused because the session limit was reached')
+tier_transitions_total = metrics_registry.counter(
+    'eduface_service_tier_transitions_total', 'Changes of the service tier', labelnames=('from', 'to'))
+metrics_registry.gauge('eduface_service_tier', 'Current service tier (0: full ... 3: detection only)',
+                       func=lambda: degradation.tier)
+metrics_registry.gauge('eduface_server_load', 'Smoothed server load driving the service tier (0-1)',
+                       func=lambda: degradation.load)
+metrics_registry.gauge(
+    'eduface_frames_in_flight', 'Frames being processed over all sessions', func=lambda: frame_coalescer.in_flight)
+metrics_registry.counter(
+    'eduface_landmark_gate_hits_total', 'Frames whose emotion inference was skipped by the landmark gate',
+    func=lambda: landmark_gate.hits)
+metrics_registry.gauge('eduface_sessions_active', 'Connected client sessions', func=lambda: len(session_options))
+metrics_registry.gauge('eduface_dashboards_active', 'Connected instructor dashboards', func=lambda: len(dashboards))
+metrics_registry.gauge(
+    'eduface_inference_load', 'Fraction of the inference queue in use (0-1)', func=lambda: inference_load())
+metrics_registry.gauge(
+    'eduface_inference_pending', 'Inference calls running or queued', func=lambda: inference_executor.pending)
+if inference_pool is not None:
+    metrics_registry.gauge(
+        'eduface_inference_process_batches', 'Batches being analyzed by inference worker processes',
+        func=lambda: inference_pool.pending)
+
+def warm_up_models():
+    """
+    Load the emotion model and run every stage of the pipeline once on dummy inputs.
+    This function blocks and is meant to run on an inference worker thread.
+    """
+    face_size = (config.FACE_CROP_SIZE, config.FACE_CROP_SIZE)
+    if inference_pool is not None:
+        # Each worker process loads and warms up its own model before reporting ready
+        model_steps = [('start_inference_processes', inference_pool.start)]
+    else:
+        model_steps = [
+            ('load_emotion_model', emotion_analyzer.load),
+            ('warm_up_emotion_model', lambda: emotion_analyzer.warm_up(face_size))
+        ]
+    if face_landmarker is not None:
+        model_steps.append(('load_landmark_model', face_landmarker.load))
+    if fallback_analyzer is not None:
+        model_steps += [
+            ('load_fallback_model', fallback_analyzer.load),
+            ('warm_up_fallback_model', lambda: fallback_analyzer.warm_up(face_size))
+        ]
+    model_warmup.run(model_steps + [
+        ('warm_up_face_detector', lambda: face_extractor.extract_face(np.zeros((480, 640, 3), dtype=np.uint8)))
+    ])
+
+async def startup():
+    """
+    Start warming up the models when the server starts.
+    Runs in the background, so the server answers health checks (as not ready) meanwhile.
+    """
+    warmup_task = asyncio.ensure_future(inference_executor.run(warm_up_models))
+    background_tasks.add(warmup_task)
+    warmup_task.add_done_callback(background_tasks.discard)
+
+    summary_task = asyncio.ensure_future(broadcast_class_summaries())
+    background_tasks.add(summary_task)
+    summary_task.add_done_callback(background_tasks.discard)
+
+    if emotion_timeline is not None:
+        flush_task = asyncio.ensure_future(flush_timeline())
+        background_tasks.add(flush_task)
+        flush_task.add_done_callback(background_tasks.discard)
+
+    # 'kill -USR1 <pid>' starts a profile of the default duration, or ends the running one.
+    # Handlers can only be installed from the main thread, not when the server runs in another one
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, toggle_profiling)
+
+def toggle_profiling(signum=None, frame=None):
+    """
+    Start a profile of the default duration, or stop the running one.
+    """
+    if profiler.active:
+        profiler.stop()
+        return
+    try:
+        profiler.start(config.PROFILE_SECONDS)
+    except ValueError:
+        # Raised in a signal handler, it would otherwise surface in whatever the main thread was running
+        logger.exception('Could not start profiling')
+
+async def shutdown():
+    """
+    Stop the inference workers and write the emotion timeline to disk when the server stops.
+    """
+    for task in list(background_tasks):
+        task.cancel()
+    inference_executor.shutdown()
+    if inference_pool is not None:
+        inference_pool.stop()
+    if emotion_timeline is not None:
+        emotion_timeline.close()
+
+def decode_frame(data):
+    """
+    Decode a JPEG frame into a BGR image.
+    The frame is either raw bytes (Socket.IO binary attachment), decoded straight from
+    the received buffer, or a base64 string as sent by older clients.
+    Raises ValueError if the data cannot be decoded.
+    """
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    np_arr = np.frombuffer(data, np.uint8)  # Wraps the buffer without copying it
+    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError('cv2.imdecode returned no image')
+    return img
+
+def detect_face(sid, img):
+    """
+    Run face extraction on a decoded frame, tracking the face of the session between frames.
+    This function blocks and is meant to run on an inference worker thread.
+
+    Returns:
+        tuple: (face_img, face_position, signature, features) where signature is used by the emotion cache
+            and features are the engagement features used by the landmark gate (None if it is disabled
+            or no landmarks were found), (None, None, None, None) if no face was detected
+    """
+    start = time.perf_counter()
+    face_img, face_position = face_extractor.extract_face(img, session_id=sid)
+    stage_duration.labels('detect').observe(time.perf_counter() - start)
+
+    if face_img is None:
+        return None, None, None, None
+
+    features = None
+    if face_landmarker is not None:
+        start = time.perf_counter()
+        points = face_landmarker.landmarks(face_img)
+        if points is not None:
+            features = engagement_features(points)
+            # Rotate a tilted head upright, the emotion models are trained on upright faces
+            roll = float(features[ENGAGEMENT_FEATURES.index('roll')])
+            if abs(roll) >= MIN_ALIGN_ANGLE:
+                face_img = align(face_img, roll)
+        stage_duration.labels('landmarks').observe(time.perf_counter() - start)
+
+    return face_img, face_position, emotion_cache.signature(face_img), features
+
+def detect_faces(img):
+    """
+    Run face extraction for every face of a decoded frame.
+    This function blocks and is meant to run on an inference worker thread.
+
+    Returns:
+        list: (face_img, face_position) tuples, largest face first
+    """
+    start = time.perf_counter()
+    faces = face_extractor.extract_faces(img, max_faces=config.MAX_FACES)
+    stage_duration.labels('detect').observe(time.perf_counter() - start)
+    return faces
+
+async def emit_frame_result(sid, seq, face_position, scores, engagement=None):
+    """
+    Send the analysis result of a frame, in the payload format the client asked for.
+    """
+    if wants_frame_results(sid):
+        start = time.perf_counter()
+        payload = build_frame_result(session_options.get(sid, {}), seq, face_position, scores, engagement)
+        await sio.emit('frame_received', payload, room=sid)
+        stage_duration.labels('emit').observe(time.perf_counter() - start)
+
+async def emit_multi_face_result(sid, seq, face_positions, face_scores):
+    """
+    Send the analysis result of a frame in multi-face mode.
+    """
+    if wants_frame_results(sid):
+        start = time.perf_counter()
+        payload = build_multi_face_result(session_options.get(sid, {}), seq, face_positions, face_scores)
+        await sio.emit('frame_received', payload, room=sid)
+        stage_duration.labels('emit').observe(time.perf_counter() - start)
+
+async def emit_frame_error(sid, seq, error, reason):
+    """
+    Tell the client its frame could not be analyzed.
+    """
+    frame_errors_total.labels(reason).inc()
+    payload = build_frame_error(session_options.get(sid, {}), seq, error)
+    await sio.emit('frame_received', payload, room=sid)
+
+async def emit_server_busy(sid, seq, error):
+    """
+    Tell the client its frame was dropped because the inference queue is full.
+    """
+    logger.warning('Dropping frame from %s: %s', sid, error)
+    await emit_frame_error(sid, seq, 'Server busy', 'server_busy')
+
+async def emit_emotion_state(sid, scores):
+    """
+    Update the smoothed emotion state of the session and emit it when it changed
+    or when a heartbeat is due. The raw scores are also recorded in the emotion timeline.
+    """
+    if emotion_timeline is not None:
+        emotion_timeline.append(sid, scores)
+
+    event = emotion_state_tracker.update(sid, scores)
+    class_aggregator.update(sid, scores, emotion_state_tracker.emotion(sid))
+    if event is not None:
+        await sio.emit('emotion_state', event, room=sid)
+
+def read_class_id(options):
+    """
+    Read the class id a client sent when connecting, as a string of at most MAX_CLASS_ID_LENGTH characters.
+    Numbers are accepted and converted. Raises ValueError for any other type or length.
+
+    Returns:
+        str or None: The class id, None if the client did not send one
+    """
+    class_id = options.get('classId')
+    if class_id is None:
+        return None
+    if isinstance(class_id, int) and not isinstance(class_id, bool):
+        class_id = str(class_id)
+    if not isinstance(class_id, str) or not 0 < len(class_id) <= MAX_CLASS_ID_LENGTH:
+        raise ValueError('classId must be a non-empty string of at most %d characters' % MAX_CLASS_ID_LENGTH)
+    return class_id
+
+def class_room(class_id):
+    return f'class:{class_id}'
+
+def dashboard_room(class_id):
+    return f'dashboard:{class_id}'
+
+async def broadcast_class_summaries():
+    """
+    Send the aggregates of every class watched by a dashboard, once per tick.
+    Dashboards get one summary event per class and tick instead of every learner's frame results.
+    """
+    while True:
+        await asyncio.sleep(config.CLASS_SUMMARY_INTERVAL)
+        for class_id in set(dashboards.values()):
+            # One failing class must not stop the summaries of the others, nor of the next ticks
+            try:
+                await sio.emit('class_summary', class_aggregator.summary(class_id), room=dashboard_room(class_id))
+            except Exception:
+                logger.exception('Sending the summary of class %s failed', class_id)
+
+async def flush_timeline():
+    """
+    Write the emotion timeline to disk every TIMELINE_FLUSH_INTERVAL seconds and extend its files
+    before they fill up, on a worker thread so the disk I/O does not block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(config.TIMELINE_FLUSH_INTERVAL)
+        try:
+            await loop.run_in_executor(None, emotion_timeline.reserve)
+            await loop.run_in_executor(None, emotion_timeline.flush)
+        except Exception:
+            logger.exception('Writing the emotion timeline failed')
+
+def inference_load():
+    """
+    Get how full the inference queue is, from 0 (idle) to 1 (new frames are rejected).
+    """
+    load = inference_executor.pending / inference_executor.capacity
+    if inference_pool is not None:
+        load = max(load, inference_pool.pending / inference_pool.slots)
+    return load
+
+def server_load():
+    """
+    Get the load of the server, from 0 (idle) to 1 (saturated): the fuller of the inference queue
+    and of the frames in flight allowed over all sessions.
+    """
+    load = inference_load()
+    if config.MAX_FRAMES_IN_FLIGHT:
+        load = max(load, frame_coalescer.in_flight / config.MAX_FRAMES_IN_FLIGHT)
+    return load
+
+async def update_service_tier(sid):
+    """
+    Update the service tier from the current load, and tell the session which tier
+    its frames are analyzed in when that changed since it was last told.
+    """
+    transition = degradation.update(server_load())
+    if transition is not None:
+        previous, tier = TIERS[transition[0]], TIERS[transition[1]]
+        tier_transitions_total.labels(previous, tier).inc()
+        logger.warning('Service tier changed from %s to %s (load %.2f, %d sessions)',
+                       previous, tier, degradation.load, len(session_options))
+
+    if session_tiers.get(sid) != degradation.tier:
+        session_tiers[sid] = degradation.tier
+        await sio.emit('service_tier', {'tier': degradation.tier, 'name': degradation.name}, room=sid)
+
+def emotion_batcher_for_tier():
+    """
+    Get the batcher analyzing emotions in the current service tier, None in detection-only tier.
+    """
+    if degradation.tier >= DETECTION_ONLY:
+        return None
+    if degradation.tier == FALLBACK_ANALYZER:
+        return fallback_batcher
+    return emotion_batcher
+
+def reduced_rate_due(sid):
+    """
+    Check whether a frame of a session may be analyzed. From the reduced rate tier on, the server
+    analyzes a session at most once per REDUCED_RATE_INTERVAL_MS itself, whatever the client does
+    with 'frame_interval'. Always true in the full tier.
+    """
+    if degradation.tier < REDUCED_RATE:
+        return True
+    return frame_rate_controller.due(sid, config.REDUCED_RATE_INTERVAL_MS)
+
+async def emit_frame_interval(sid):
+    """
+    Tell the client how often to send frames when its target interval changed noticeably.
+    Clients that ignore the event keep their own fixed interval.
+    """
+    if not config.ADAPTIVE_FRAME_INTERVAL:
+        return
+
+    # From the reduced rate tier on, every client is asked for the longest interval
+    load = 1.0 if degradation.tier >= REDUCED_RATE else inference_load()
+    interval = frame_rate_controller.update(sid, emotion_state_tracker.stable_for(sid), load)
+    if interval is not None:
+        await sio.emit('frame_interval', {'intervalMs': interval}, room=sid)
+
+def session_gone(sid):
+    """
+    Check whether a session disconnected while one of its frames was being awaited.
+    Its frame must then not write any per-session state, which disconnect would never clean up again;
+    the face track its detection may have re-created meanwhile is dropped.
+    """
+    if sid in session_options:
+        return False
+    face_extractor.forget(sid)
+    return True
+
+def wants_frame_results(sid):
+    """
+    Check whether the client wants a 'frame_received' result for every frame.
+    Clients relying only on 'emotion_state' events can opt out when connecting
+    with the auth option {'frameResults': false}.
+    """
+    return session_options.get(sid, {}).get('frameResults', True)
+
+def wants_multi_face(sid):
+    """
+    Check whether the client asked for every face of its frames to be analyzed,
+    with the auth option {'multiFace': true} (e.g. a camera shared by several learners).
+    """
+    return session_options.get(sid, {}).get('multiFace', False)
 
 # Event handler for client connection
 @sio.event
-async def connect(sid, environ):
-    print(f'Client connected: {sid}')
+async def connect(sid, environ, auth=None):
+    # Refuse new learners rather than slowing down everyone already connected
+    if config.MAX_SESSIONS and len(session_options) >= config.MAX_SESSIONS:
+        sessions_rejected_total.inc()
+        logger.warning('Refusing connection %s: %d sessions connected', sid, len(session_options))
+        raise ConnectionRefusedError('Server full')
+
+    options = auth if isinstance(auth, dict) else {}
+    # Validated before any state is changed, a refused connection gets no disconnect event to clean up
+    try:
+        class_id = read_class_id(options)
+    except ValueError as e:
+        logger.warning('Refusing connection %s: %s', sid, e)
+        raise ConnectionRefusedError('Invalid classId')
+
+    # Instructor dashboards only receive the class summaries, they do not send frames
+    if options.get('role') == 'dashboard':
+        if class_id is None:
+            raise ConnectionRefusedError('Missing classId')
+        dashboards[sid] = class_id
+        await sio.enter_room(sid, dashboard_room(class_id))
+        logger.info('Dashboard connected: %s (class %s)', sid, class_id)
+        return
+
+    session_options[sid] = dict(options, classId=class_id)
+    if class_id is not None:
+        class_aggregator.join(sid, class_id)
+        await sio.enter_room(sid, class_room(class_id))
+    if emotion_timeline is not None:
+        emotion_timeline.start_session(sid, learnerId=session_options[sid].get('learnerId'))
+    logger.info('Client connected: %s', sid)
 
 # Event handler for client disconnection
 @sio.event
 async def disconnect(sid):
-    print(f'Client disconnected: {sid}')
+    if dashboards.pop(sid, None) is not None:
+        logger.info('Dashboard disconnected: %s', sid)
+        return
+
+    frame_stats = frame_coalescer.remove(sid)
+    face_extractor.forget(sid)
+    emotion_cache.forget(sid)
+    emotion_state_tracker.forget(sid)
+    landmark_gate.forget(sid)
+    frame_rate_controller.forget(sid)
+    class_aggregator.leave(sid)
+    session_options.pop(sid, None)
+    session_tiers.pop(sid, None)
+    logger.info('Client disconnected: %s (frames: %s)', sid, frame_stats)
 
 # Event handler for receiving a 'ping' event from the client
 @sio.event
 async def ping(sid, data):
-    print(f'Ping received from {sid}')
+    logger.debug('Ping received from %s', sid)
     # Respond to the client with a 'pong' event
     await sio.emit('pong', room=sid)
 
-# Event handler for receiving a frame from the client
+# Event handler for receiving a 'stats' request from the client
+@sio.event
+async def stats(sid, data=None):
+    await sio.emit('stats', {
+        'session': frame_coalescer.stats(sid),
+        'frameIntervalMs': frame_rate_controller.intervals.get(sid),
+        'detection': face_extractor.stats(),
+        'cache': emotion_cache.stats(),
+        'landmarkGate': landmark_gate.stats() if face_landmarker is not None else None,
+        'batching': emotion_batcher.stats(),
+        'service': degradation.status()
+    }, room=sid)
+
+# Admin event controlling runtime profiling: {'token': ..., 'action': 'start' | 'stop' | 'status',
+# 'seconds': ..., 'frames': ...}. A capture ends after the given seconds or number of frames, whichever comes first.
 @sio.event
-async def frame(sid, data):
-    print(f'Frame received from {sid}: {type(data)}')
+async def profile(sid, data=None):
+    data = data if isinstance(data, dict) else {}
+    # compare_digest only takes ASCII strings, bytes work for any token
+    token = str(data.get('token', '')).encode('utf-8')
+    if not config.ADMIN_TOKEN or not hmac.compare_digest(token, config.ADMIN_TOKEN.encode('utf-8')):
+        logger.warning('Refused profile request from %s', sid)
+        await sio.emit('profile', {'error': 'Unauthorized'}, room=sid)
+        return
+
+    action = data.get('action', 'start')
+    if action == 'start':
+        try:
+            seconds = float(data.get('seconds') or config.PROFILE_SECONDS)
+            frames = int(data['frames']) if data.get('frames') else None
+            # nan would slip through the max_duration cap and end the capture at once
+            if not math.isfinite(seconds) or seconds <= 0 or (frames is not None and frames <= 0):
+                raise ValueError('seconds and frames must be positive')
+        except (TypeError, ValueError):
+            await sio.emit('profile', {'error': 'Invalid seconds or frames'}, room=sid)
+            return
+        if not profiler.start(seconds, frames, frame_count=lambda: frames_total.value):
+            await sio.emit('profile', {'error': 'Profiling already running', **profiler.status()}, room=sid)
+            return
+    elif action == 'stop':
+        profiler.stop()
+
+    await sio.emit('profile', profiler.status(), room=sid)
+
+# Event handler for receiving a frame from the client.
+# Clients may pass a sequence number after the frame, echoed back in compact payloads.
+@sio.event
+async def frame(sid, data, seq=None):
+    logger.debug('Frame received from %s: %s', sid, type(data).__name__)
+    # Dashboards and sessions that already disconnected have no per-session state to analyze frames with
+    if sid not in session_options:
+        return
+    frames_total.inc()
+
+    if seq is None:
+        seq = frame_coalescer.stats(sid)['received'] + 1
+
+    # Refuse frames until the models are loaded, instead of stalling the first learners
+    if not model_warmup.ready:
+        await emit_frame_error(sid, seq, 'Server warming up', 'warming_up')
+        return
+
+    # Bound the work in flight over all sessions; frames of a busy session only replace its queued frame
+    if (config.MAX_FRAMES_IN_FLIGHT and frame_coalescer.in_flight >= config.MAX_FRAMES_IN_FLIGHT
+            and not frame_coalescer.is_busy(sid)):
+        await emit_frame_error(sid, seq, 'Server busy', 'overloaded')
+        return
+
+    # Keep at most one frame per session in flight: if one is already being processed,
+    # this frame waits in its place and replaces any older frame still waiting
+    queued_frame = (data, seq)
+    if not frame_coalescer.offer(sid, queued_frame):
+        return
 
-    # Step 0: Decode base64 image to numpy array
+    while queued_frame is not None:
+        start = time.perf_counter()
+        try:
+            await update_service_tier(sid)
+            await process_frame(sid, *queued_frame)
+            if not session_gone(sid):
+                await emit_frame_interval(sid)
+        except Exception:
+            frame_errors_total.labels('processing').inc()
+            logger.exception('Error processing frame from %s', sid)
+        stage_duration.labels('total').observe(time.perf_counter() - start)
+        queued_frame = frame_coalescer.next(sid)
+
+async def process_frame(sid, data, seq):
+    """
+    Analyze one frame of a session and emit the result to it.
+    """
+    # Step 0: Decode the binary or base64 JPEG to a numpy array
+    start = time.perf_counter()
     try:
-        img_bytes = base64.b64decode(data)
-        np_arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        img = decode_frame(data)
     except Exception as e:
-        print(f'Error decoding base64 image: {e}')
-        await sio.emit('frame_received', {
-            'hasDetectedFace': 'false',
-            'error': 'Invalid image data'
-        }, room=sid)
+        logger.info('Error decoding image from %s: %s', sid, e)
+        await emit_frame_error(sid, seq, 'Invalid image data', 'invalid_image')
+        return
+    stage_duration.labels('decode').observe(time.perf_counter() - start)
+
+    if wants_multi_face(sid):
+        await process_faces(sid, seq, img)
         return
 
-    # Step 1: Try to extract the face
-    face_img, face_position = face_extractor.extract_face(img)
+    # Step 1: Extract the face on an inference worker,
+    # so the event loop keeps serving other clients meanwhile
+    try:
+        face_img, face_position, signature, features = await inference_executor.run(detect_face, sid, img)
+    except InferenceQueueFull as e:
+        await emit_server_busy(sid, seq, e)
+        return
+
+    if session_gone(sid):
+        return
 
     if face_img is None:
         # No face detected, return
-        await sio.emit('frame_received', {
-            'hasDetectedFace': 'false'
-            }, room=sid)
+        await emit_emotion_state(sid, None)
+        await emit_frame_result(sid, seq, None, None)
         return
 
-    # Step 2: Analyze the face and get all emotions
-    emotions_dict = deep_face_analyzer.get_emotions(face_img)
+    faces_total.inc()
 
-    # Convert all values in emotions_dict to native Python types for JSON serialization
-    emotions_dict = make_json_serializable(emotions_dict)
+    # Step 2: Reuse the last scores if the face geometry or pixels barely changed, otherwise analyze it
+    # together with the faces of other sessions in one batch, with the analyzer of the current tier.
+    # With landmarks the gate decides alone: a changed expression can keep a similar pixel signature.
+    batcher = emotion_batcher_for_tier()
+    scores = None
+    if batcher is not None and not reduced_rate_due(sid):
+        # Too soon after the session's last analysis for the reduced rate tier
+        scores = emotion_cache.latest(sid)
+    if batcher is not None and scores is None:
+        if features is not None:
+            scores = landmark_gate.lookup(sid, features)
+        else:
+            scores = emotion_cache.lookup(sid, signature)
 
-    # Step 3: Return analysis result
-    await sio.emit('frame_received', {
-        'hasDetectedFace': 'true',
-        'emotions': emotions_dict
-    }, room=sid)
+    if scores is None and batcher is not None:
+        try:
+            scores = await batcher.analyze(sid, face_img)
+        except InferenceQueueFull as e:
+            await emit_server_busy(sid, seq, e)
+            return
+
+        if session_gone(sid):
+            return
+
+        if scores is not None and not has_scores(scores):
+            # The analyzer found no face in the crop (e.g. FER), the frame counts as faceless
+            await emit_emotion_state(sid, None)
+            await emit_frame_result(sid, seq, None, None)
+            return
+
+        if scores is not None:
+            emotion_cache.store(sid, signature, scores)
+            if features is not None:
+                landmark_gate.store(sid, features, scores)
+
+    # Step 3: Return analysis result, the smoothed state only when it is worth sending
+    if scores is not None:
+        await emit_emotion_state(sid, scores)
+
+    engagement = engagement_payload(features) if features is not None else None
+    await emit_frame_result(sid, seq, face_position, scores, engagement)
+
+async def process_faces(sid, seq, img):
+    """
+    Analyze every face of a decoded frame and emit the result to the session.
+    Detection runs once for the frame and all crops are queued for the same inference batch.
+    """
+    try:
+        faces = await inference_executor.run(detect_faces, img)
+    except InferenceQueueFull as e:
+        await emit_server_busy(sid, seq, e)
+        return
+
+    if session_gone(sid):
+        return
+
+    face_scores = [None] * len(faces)
+    batcher = emotion_batcher_for_tier()
+    # Frames too soon after the session's last analysis in the reduced rate tier only get the face boxes
+    if faces and batcher is not None and reduced_rate_due(sid):
+        try:
+            face_scores = await batcher.analyze_many(sid, [face_img for face_img, _ in faces])
+        except InferenceQueueFull as e:
+            await emit_server_busy(sid, seq, e)
+            return
+
+        if session_gone(sid):
+            return
+
+        # Drop the crops in which the analyzer found no face (e.g. FER), as if they had not been detected
+        kept = [i for i, scores in enumerate(face_scores) if scores is None or has_scores(scores)]
+        faces, face_scores = [faces[i] for i in kept], [face_scores[i] for i in kept]
+
+    if not faces:
+        await emit_emotion_state(sid, None)
+        await emit_multi_face_result(sid, seq, [], [])
+        return
+
+    faces_total.inc()
+
+    # The smoothed state of the session follows its largest face
+    if face_scores[0] is not None:
+        await emit_emotion_state(sid, face_scores[0])
+
+    await emit_multi_face_result(sid, seq, [face_position for _, face_position in faces], face_scores)
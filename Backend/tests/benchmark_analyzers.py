@@ -0,0 +1,237 @@
+import sys
+import os
+import cv2
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from modules.face_extractor import FaceExtractor
+from modules.emotion_analyzer import create_analyzer, has_scores, EMOTION_LABELS
+
+# Compares every face detector / emotion analyzer combination on a labeled image directory:
+# latency per frame, peak memory, model load time, detection recall and emotion accuracy.
+# The directory holds one folder per emotion named as EMOTION_LABELS (other folders are skipped):
+#   faces/happy/001.jpg, faces/sad/002.jpg, ...
+# Usage:
+#   python benchmark_analyzers.py faces --detectors haar haar-320 mediapipe --analyzers deepface onnx fer
+#   python benchmark_analyzers.py fer2013/test --detectors none --limit 200 --output results
+#
+# Detector 'none' uses the whole image as the face, for datasets of pre-cropped faces.
+# Each combination runs in its own process, so load time and peak memory are measured from a clean start.
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+DETECTORS = ['none', 'haar', 'haar-320', 'mediapipe']
+
+
+def load_dataset(root, limit=None):
+    """
+    List the labeled images of a dataset directory.
+
+    Returns:
+        list: (path, label) tuples, at most limit per label
+    """
+    samples = []
+    for label in EMOTION_LABELS:
+        directory = os.path.join(root, label)
+        if not os.path.isdir(directory):
+            continue
+        names = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+        samples.extend((os.path.join(directory, name), label) for name in names[:limit])
+    return samples
+
+
+class WholeImageDetector:
+    """
+    Uses the whole image as the face crop.
+    """
+    def __init__(self, face_size):
+        self.face_size = face_size
+
+    def load(self):
+        pass
+
+    def detect(self, img):
+        return cv2.resize(img, self.face_size, interpolation=cv2.INTER_AREA)
+
+
+class HaarDetector:
+    """
+    The Haar cascade of FaceExtractor, at full resolution or downscaled to a detection width.
+    """
+    def __init__(self, face_size, detection_width=None):
+        self.extractor = FaceExtractor(detection_width=detection_width, face_size=face_size)
+
+    def load(self):
+        pass
+
+    def detect(self, img):
+        return self.extractor.extract_face(img)[0]
+
+
+class MediaPipeDetector:
+    """
+    MediaPipe's short-range face detector.
+    """
+    def __init__(self, face_size):
+        self.face_size = face_size
+        self.detector = None
+
+    def load(self):
+        import mediapipe as mp
+        self.detector = mp.solutions.face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+
+    def detect(self, img):
+        results = self.detector.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        if not results.detections:
+            return None
+
+        box = results.detections[0].location_data.relative_bounding_box
+        height, width = img.shape[:2]
+        x, y = max(int(box.xmin * width), 0), max(int(box.ymin * height), 0)
+        w, h = int(box.width * width), int(box.height * height)
+        if w <= 0 or h <= 0:
+            return None
+        return cv2.resize(img[y:y+h, x:x+w], self.face_size, interpolation=cv2.INTER_AREA)
+
+
+def create_detector(name, face_size):
+    if name == 'none':
+        return WholeImageDetector(face_size)
+    if name == 'haar':
+        return HaarDetector(face_size)
+    if name == 'haar-320':
+        return HaarDetector(face_size, detection_width=320)
+    if name == 'mediapipe':
+        return MediaPipeDetector(face_size)
+    raise ValueError(f'Unknown detector: {name}')
+
+
+def memory_usage():
+    """
+    Resident memory of this process in MB, None without psutil.
+    """
+    return psutil.Process().memory_info().rss / 2**20 if psutil is not None else None
+
+
+def run_combination(detector_name, analyzer_name, samples, face_size):
+    """
+    Benchmark one detector / analyzer combination. Runs in a fresh process.
+
+    Returns:
+        dict: One row of the comparison table
+    """
+    cv2.setNumThreads(1)  # Per-core latency, like one inference worker of the server
+    peak_memory = memory_usage()
+
+    start = time.perf_counter()
+    detector = create_detector(detector_name, face_size)
+    detector.load()
+    analyzer = create_analyzer(analyzer_name, **config.ANALYZER_OPTIONS.get(analyzer_name, {}))
+    analyzer.load()
+    analyzer.warm_up(face_size)
+    load_time = time.perf_counter() - start
+
+    detect_times, analyze_times, frame_times = [], [], []
+    detected, correct = 0, 0
+    for path, label in samples:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+
+        frame_start = time.perf_counter()
+        face_img = detector.detect(img)
+        detect_end = time.perf_counter()
+        detect_times.append(detect_end - frame_start)
+
+        if face_img is not None:
+            detected += 1
+            scores = analyzer.get_emotions_batch([face_img])
+            analyze_times.append(time.perf_counter() - detect_end)
+            if has_scores(scores) and EMOTION_LABELS[int(np.argmax(scores[0]))] == label:
+                correct += 1
+
+        frame_times.append(time.perf_counter() - frame_start)
+
+        memory = memory_usage()
+        if memory is not None:
+            peak_memory = max(peak_memory, memory)
+
+    frames = len(frame_times)
+    frame_ms = np.array(frame_times) * 1000
+    return {
+        'detector': detector_name,
+        'analyzer': analyzer_name,
+        'images': frames,
+        'msPerFrameMean': round(float(frame_ms.mean()), 2) if frames else None,
+        'msPerFrameP95': round(float(np.percentile(frame_ms, 95)), 2) if frames else None,
+        'detectMsMean': round(float(np.mean(detect_times)) * 1000, 2) if detect_times else None,
+        'analyzeMsMean': round(float(np.mean(analyze_times)) * 1000, 2) if analyze_times else None,
+        'peakRssMb': round(peak_memory, 1) if peak_memory is not None else None,
+        'loadSeconds': round(load_time, 2),
+        'detectionRecall': round(detected / frames, 4) if frames else None,
+        # Accuracy over the detected faces, and over every image (a missed face counts as wrong)
+        'accuracy': round(correct / detected, 4) if detected else None,
+        'endToEndAccuracy': round(correct / frames, 4) if frames else None
+    }
+
+
+def markdown_table(results):
+    """
+    Format the results as a Markdown table.
+    """
+    columns = list(results.columns)
+    lines = ['| ' + ' | '.join(columns) + ' |', '|' + '---|' * len(columns)]
+    for row in results.itertuples(index=False):
+        lines.append('| ' + ' | '.join('' if pd.isna(value) else str(value) for value in row) + ' |')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark face detector and emotion analyzer combinations')
+    parser.add_argument('dataset', help='Directory with one folder of face images per emotion')
+    parser.add_argument('--detectors', nargs='+', default=['haar', 'haar-320'], choices=DETECTORS,
+                        help='Face detectors to compare')
+    parser.add_argument('--analyzers', nargs='+', default=[config.EMOTION_ANALYZER],
+                        help='Emotion analyzers to compare (names registered in modules/emotion_analyzer.py)')
+    parser.add_argument('--limit', type=int, help='Maximum number of images per emotion')
+    parser.add_argument('--output', help='Write the table to <output>.csv and <output>.md')
+    args = parser.parse_args()
+
+    samples = load_dataset(args.dataset, args.limit)
+    if not samples:
+        print('No labeled images found.')
+        sys.exit(1)
+    print(f'{len(samples)} images in {len({label for _, label in samples})} emotions')
+
+    face_size = (config.FACE_CROP_SIZE, config.FACE_CROP_SIZE)
+    rows = []
+    for detector_name in args.detectors:
+        for analyzer_name in args.analyzers:
+            print(f'Running {detector_name} + {analyzer_name}...')
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn')) as pool:
+                    rows.append(pool.submit(run_combination, detector_name, analyzer_name, samples, face_size).result())
+            except Exception as e:
+                print(f'  failed: {e}')
+
+    if not rows:
+        sys.exit(1)
+
+    results = pd.DataFrame(rows).sort_values('msPerFrameMean')
+    table = markdown_table(results)
+    print(table)
+
+    if args.output:
+        results.to_csv(f'{args.output}.csv', index=False)
+        with open(f'{args.output}.md', 'w') as f:
+            f.write(table + '\n')
@@ -0,0 +1,108 @@
+import sys
+import os
+import cv2
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from modules.face_extractor import FaceExtractor
+from modules.camera import Camera
+
+# Compares face detection at full resolution with detection on a downscaled frame.
+# Usage:
+#   python benchmark_face_detect.py --images path/to/frames --width 320
+#   python benchmark_face_detect.py --frames 50        (captures frames from the webcam)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_images(directory):
+    """
+    Load every image of a directory.
+    """
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            frame = cv2.imread(os.path.join(directory, name))
+            if frame is not None:
+                frames.append(frame)
+    return frames
+
+
+def capture_frames(count):
+    """
+    Capture frames from the webcam.
+    """
+    camera = Camera()
+    if not camera.is_opened():
+        print("Failed to open camera")
+        sys.exit(1)
+
+    frames = []
+    while len(frames) < count:
+        frame = camera.read_frame()
+        if frame is not None:
+            frames.append(frame)
+    camera.release()
+    return frames
+
+
+def iou(a, b):
+    """
+    Intersection over union of two face location dictionaries.
+    """
+    x0, y0 = max(a['x'], b['x']), max(a['y'], b['y'])
+    x1 = min(a['x'] + a['width'], b['x'] + b['width'])
+    y1 = min(a['y'] + a['height'], b['y'] + b['height'])
+    intersection = max(x1 - x0, 0) * max(y1 - y0, 0)
+    union = a['width'] * a['height'] + b['width'] * b['height'] - intersection
+    return intersection / union if union else 0.0
+
+
+def run(extractor, frames):
+    """
+    Detect the face of every frame, returning the locations and the time per frame in milliseconds.
+    """
+    locations, times = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        _, location = extractor.extract_face(frame)
+        times.append((time.perf_counter() - start) * 1000)
+        locations.append(location)
+    return locations, np.array(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark downscaled face detection against full resolution')
+    parser.add_argument('--images', help='Directory of frames to use instead of the webcam')
+    parser.add_argument('--frames', type=int, default=50, help='Number of webcam frames to capture')
+    parser.add_argument('--width', type=int, default=320, help='Width frames are downscaled to before detection')
+    parser.add_argument('--iou', type=float, default=0.5, help='Minimum overlap for two detections to match')
+    args = parser.parse_args()
+
+    frames = load_images(args.images) if args.images else capture_frames(args.frames)
+    if not frames:
+        print("No frames to benchmark.")
+        sys.exit(1)
+
+    height, width = frames[0].shape[:2]
+    print(f'{len(frames)} frames of {width}x{height}')
+
+    full_locations, full_times = run(FaceExtractor(), frames)
+    small_locations, small_times = run(FaceExtractor(detection_width=args.width), frames)
+
+    # A frame matches when both paths find no face, or both find overlapping faces
+    matches = sum(
+        (a is None and b is None) or (a is not None and b is not None and iou(a, b) >= args.iou)
+        for a, b in zip(full_locations, small_locations)
+    )
+
+    for name, times, locations in [('full resolution', full_times, full_locations),
+                                   (f'downscaled to {args.width}px', small_times, small_locations)]:
+        found = sum(location is not None for location in locations)
+        print(f'{name:>24}: mean {times.mean():7.2f} ms, p95 {np.percentile(times, 95):7.2f} ms, '
+              f'faces found in {found}/{len(frames)} frames')
+
+    print(f'Speedup: {full_times.mean() / small_times.mean():.2f}x')
+    print(f'Matching detections: {matches}/{len(frames)} ({100 * matches / len(frames):.1f}%)')
@@ -0,0 +1,281 @@
+import sys
+import os
+import cv2
+import json
+import base64
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+import numpy as np
+import socketio
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Load test for the Socket.IO server, no webcam needed.
+# Simulates concurrent learners streaming JPEG frames and reports throughput, end-to-end latency
+# percentiles, dropped frames and server CPU/RSS as JSON.
+# Usage:
+#   python benchmark_socket_load.py --start-server --clients 30 --fps 1 --duration 60 --output load.json
+#   python benchmark_socket_load.py --url http://localhost:3000 --frames path/to/jpegs --binary
+#
+# Frames are sent with the compact protocol (auth {'protocol': 2}) so every response
+# can be matched to its frame through the sequence number.
+
+
+def load_frames(directory):
+    """
+    Read every JPEG of a directory as raw bytes.
+    """
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.jpg', '.jpeg')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                frames.append(f.read())
+    return frames
+
+
+def synthetic_frames(count, width, height):
+    """
+    Generate JPEG frames of random shapes over noise.
+    They contain no face, so they exercise decoding and detection but not emotion inference.
+    """
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(count):
+        img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        for _ in range(5):
+            center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            axes = (int(rng.integers(20, width // 4)), int(rng.integers(20, height // 4)))
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            cv2.ellipse(img, center, axes, 0, 0, 360, color, -1)
+        _, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        frames.append(buffer.tobytes())
+    return frames
+
+
+def start_server(port):
+    """
+    Start the ASGI app built by main.create_app with uvicorn in a child process.
+    """
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:create_app', '--factory',
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR
+    )
+
+
+def wait_until_ready(url, timeout):
+    """
+    Poll the health route until the server has warmed up its models.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'{url}/health', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except Exception:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+class LoadClient:
+    """
+    One simulated learner: streams frames at a fixed rate and records the latency of each response.
+    Error replies ('Server busy', warming up) are fast rejections, their latencies are kept apart
+    so they do not pull the latency of analyzed frames down when the server is overloaded.
+    """
+
+    def __init__(self, index, frames, fps, binary):
+        self.index = index
+        self.frames = frames
+        self.interval = 1 / fps
+        self.binary = binary
+        self.sio = socketio.AsyncClient()
+        self.sent = {}  # seq -> send time
+        self.latencies = []  # Of analyzed frames
+        self.error_latencies = []
+        self.errors = {}  # Error message -> count
+        self.faces = 0
+
+        self.sio.on('frame_received', self.on_frame_received)
+
+    async def on_frame_received(self, data):
+        sent_at = self.sent.pop(data.get('seq'), None)
+        latency = time.perf_counter() - sent_at if sent_at is not None else None
+        if 'error' in data:
+            self.errors[data['error']] = self.errors.get(data['error'], 0) + 1
+            if latency is not None:
+                self.error_latencies.append(latency)
+            return
+
+        if latency is not None:
+            self.latencies.append(latency)
+        if data.get('face'):
+            self.faces += 1
+
+    async def run(self, url, duration):
+        await self.sio.connect(url, auth={'protocol': 2}, transports=['websocket'])
+
+        # Spread the clients over the first interval so they do not all send at once
+        await asyncio.sleep(random.random() * self.interval)
+
+        seq = 0
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            seq += 1
+            frame = self.frames[(self.index + seq) % len(self.frames)]
+            payload = frame if self.binary else base64.b64encode(frame).decode('utf-8')
+            self.sent[seq] = time.perf_counter()
+            await self.sio.emit('frame', (payload, seq))
+            await asyncio.sleep(self.interval)
+
+        # Give the last responses time to arrive
+        await asyncio.sleep(2)
+        await self.sio.disconnect()
+        return seq
+
+
+async def sample_server(process, samples, stop):
+    """
+    Record the CPU usage and resident memory of the server process until stopped.
+    """
+    process.cpu_percent(None)
+    while not stop.is_set():
+        await asyncio.sleep(0.5)
+        try:
+            samples.append((process.cpu_percent(None), process.memory_info().rss))
+        except psutil.Error:
+            return
+
+
+def latency_stats(latencies):
+    """
+    Summarize latencies in seconds as milliseconds: mean, percentiles and max, None values if there are none.
+    """
+    latencies = np.array(latencies) * 1000
+    if not len(latencies):
+        return {'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+    return {
+        'mean': float(latencies.mean()),
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'p99': float(np.percentile(latencies, 99)),
+        'max': float(latencies.max())
+    }
+
+
+async def run_load(args, frames, server_pid):
+    clients = [LoadClient(i, frames, args.fps, args.binary) for i in range(args.clients)]
+
+    samples = []
+    stop = asyncio.Event()
+    sampler = None
+    if psutil is not None and server_pid is not None:
+        sampler = asyncio.ensure_future(sample_server(psutil.Process(server_pid), samples, stop))
+
+    start = time.perf_counter()
+    sent = await asyncio.gather(*[client.run(args.url, args.duration) for client in clients])
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    if sampler is not None:
+        await sampler
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    error_latencies = [latency for client in clients for latency in client.error_latencies]
+    errors = {}
+    for client in clients:
+        for error, count in client.errors.items():
+            errors[error] = errors.get(error, 0) + count
+    frames_sent = sum(sent)
+    analyzed = len(latencies)
+    responses = analyzed + len(error_latencies)
+
+    results = {
+        'config': {
+            'clients': args.clients,
+            'fps': args.fps,
+            'duration': args.duration,
+            'binary': args.binary,
+            'frames': 'synthetic' if not args.frames else args.frames
+        },
+        'framesSent': frames_sent,
+        'responses': responses,
+        'droppedFrames': frames_sent - responses,
+        'analyzed': analyzed,
+        'errors': sum(errors.values()),
+        'errorsByMessage': errors,
+        'facesDetected': sum(client.faces for client in clients),
+        # Frames analyzed per second, error replies excluded
+        'throughputFps': analyzed / elapsed,
+        'latencyMs': latency_stats(latencies),
+        'errorLatencyMs': latency_stats(error_latencies)
+    }
+
+    if samples:
+        cpu = np.array([sample[0] for sample in samples])
+        rss = np.array([sample[1] for sample in samples]) / 2**20
+        results['server'] = {
+            'cpuPercentMean': float(cpu.mean()),
+            'cpuPercentMax': float(cpu.max()),
+            'rssMbMean': float(rss.mean()),
+            'rssMbMax': float(rss.max())
+        }
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the EduFace Socket.IO server')
+    parser.add_argument('--url', default='http://localhost:3000', help='Server to test')
+    parser.add_argument('--start-server', action='store_true', help='Start main.py on --port instead of using --url')
+    parser.add_argument('--port', type=int, default=3100, help='Port of the server started with --start-server')
+    parser.add_argument('--server-pid', type=int, help='PID of an already running server, to sample its CPU and RSS')
+    parser.add_argument('--clients', type=int, default=10, help='Number of concurrent clients')
+    parser.add_argument('--fps', type=float, default=1.0, help='Frames per second sent by each client')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds each client streams frames')
+    parser.add_argument('--frames', help='Directory of recorded JPEG frames (synthetic frames if omitted)')
+    parser.add_argument('--width', type=int, default=640, help='Width of synthetic frames')
+    parser.add_argument('--height', type=int, default=480, help='Height of synthetic frames')
+    parser.add_argument('--binary', action='store_true', help='Send raw JPEG bytes instead of base64 strings')
+    parser.add_argument('--ready-timeout', type=float, default=120.0, help='Seconds to wait for the server to warm up')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(20, args.width, args.height)
+    if not frames:
+        print('No frames to send.')
+        sys.exit(1)
+
+    server = None
+    server_pid = args.server_pid
+    if args.start_server:
+        args.url = f'http://127.0.0.1:{args.port}'
+        server = start_server(args.port)
+        server_pid = server.pid
+
+    try:
+        if not wait_until_ready(args.url, args.ready_timeout):
+            print(f'Server at {args.url} did not become ready.')
+            sys.exit(1)
+
+        results = asyncio.run(run_load(args, frames, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -13,6 +13,9 @@ from modules.camera import Camera
 # Configurable timer interval (seconds)
 interval_seconds = 1
 
+# Send frames as raw JPEG bytes instead of base64 strings: python test_socket_emotion_timer.py --binary
+binary_mode = '--binary' in sys.argv
+
 # Socket.IO client setup
 sio = socketio.Client()
 
@@ -50,11 +53,15 @@ if __name__ == '__main__':
                 _, buffer = cv2.imencode('.jpg', frame)
                 jpg_bytes = buffer.tobytes()
 
-                # Encode as base64
-                jpg_b64 = base64.b64encode(jpg_bytes).decode('utf-8')
+                if binary_mode:
+                    # Send the raw JPEG bytes as a binary attachment
+                    payload = jpg_bytes
+                else:
+                    # Encode as base64
+                    payload = base64.b64encode(jpg_bytes).decode('utf-8')
 
-                sio.emit('frame', jpg_b64)
-                print(f'Sent frame at {time.strftime("%H:%M:%S")}')
+                sio.emit('frame', payload)
+                print(f'Sent {len(payload)} byte frame at {time.strftime("%H:%M:%S")}')
             else:
                 print("No frame captured from webcam.")
 
@@ -8,6 +8,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'  # Disable oneDNN optimizations
 from modules.camera import Camera
 
+# Send frames as raw JPEG bytes instead of base64 strings: python test_socket_webcam.py --binary
+binary_mode = '--binary' in sys.argv
+
 # Socket.IO client setup
 sio = socketio.Client()
 
@@ -46,9 +49,15 @@ if __name__ == '__main__':
             _, buffer = cv2.imencode('.jpg', frame)
             jpg_bytes = buffer.tobytes()
 
-            # Encode as base64
-            jpg_b64 = base64.b64encode(jpg_bytes).decode('utf-8')
-            sio.emit('frame', jpg_b64)
+            if binary_mode:
+                # Send the raw JPEG bytes as a binary attachment
+                payload = jpg_bytes
+            else:
+                # Encode as base64
+                payload = base64.b64encode(jpg_bytes).decode('utf-8')
+
+            sio.emit('frame', payload)
+            print(f"Sent {'binary' if binary_mode else 'base64'} frame: {len(payload)} bytes")
 
             # Wait for server response
             sio.wait()
@@ -15,6 +15,11 @@ sio = socketio.Client()
 responses = []
 frames_to_send = 5  # Number of frames to send
 
+# Send frames as raw JPEG bytes instead of base64 strings: python test_socket_webcam_multiple.py --binary
+binary_mode = '--binary' in sys.argv
+bytes_sent = 0
+start_time = None
+
 @sio.event
 def connect():
     print('Connected to socket server')
@@ -30,6 +35,9 @@ def on_frame_received(data):
 
     # Disconnect after all responses received
     if len(responses) >= frames_to_send:
+        elapsed = time.perf_counter() - start_time
+        print(f"{'Binary' if binary_mode else 'Base64'} mode: {bytes_sent} bytes sent, "
+              f"{len(responses)} responses in {elapsed:.2f}s")
         sio.disconnect()
 
 @sio.on('pong')
@@ -45,6 +53,7 @@ if __name__ == '__main__':
 
     try:
         sio.connect('http://localhost:3000')
+        start_time = time.perf_counter()
 
         for i in range(frames_to_send):
             frame = camera.read_frame()
@@ -54,18 +63,30 @@ if __name__ == '__main__':
                 _, buffer = cv2.imencode('.jpg', frame)
                 jpg_bytes = buffer.tobytes()
 
-                # Encode as base64
-                jpg_b64 = base64.b64encode(jpg_bytes).decode('utf-8')
+                if binary_mode:
+                    # Send the raw JPEG bytes as a binary attachment
+                    payload = jpg_bytes
+                else:
+                    # Encode as base64
+                    payload = base64.b64encode(jpg_bytes).decode('utf-8')
 
-                sio.emit('frame', jpg_b64)
+                sio.emit('frame', payload)
+                bytes_sent += len(payload)
 
                 print(f'Sent frame {i+1}')
                 time.sleep(0.2)  # Small delay between frames
             else:
                 print(f"No frame captured from webcam for frame {i+1}.")
 
-        # Wait for all responses
-        sio.wait()
+        # Wait for all responses (frames replaced by a newer one while the server
+        # was busy are never answered, so give up after a timeout)
+        deadline = time.time() + 10
+        while sio.connected and time.time() < deadline:
+            time.sleep(0.1)
+
+        if sio.connected:
+            print(f'Received {len(responses)} of {frames_to_send} responses')
+            sio.disconnect()
     except Exception as e:
         print(f"Socket test error: {e}")
     finally:
@@ -1,5 +1,6 @@
 import React, { useEffect, useRef, useState, useCallback } from 'react';
 import socket from '../services/socket';
+import { useFrameScheduler } from '../utils/useFrameScheduler';
 import '../styles/LearningPage.css';
 
 interface WebcamBoxProps {
@@ -86,8 +87,8 @@ const WebcamBox: React.FC<WebcamBoxProps> = ({ onAnalysisUpdate }) => {
         videoRef.current.srcObject = stream;
         videoRef.current.onloadedmetadata = () => {
           videoRef.current?.play();
-          // Start sending frames to backend
-          setInterval(captureAndSendFrame, 1000); // Send frame every second
+          // Start sending frames to backend, every second until the server asks for another interval
+          startFrameCapture();
         };
       }
     } catch (error) {
@@ -118,6 +119,9 @@ const WebcamBox: React.FC<WebcamBoxProps> = ({ onAnalysisUpdate }) => {
     }
   };
 
+  // Time between frames sent to the backend, adjusted by the server through 'frame_interval' events
+  const { start: startFrameCapture } = useFrameScheduler(captureAndSendFrame, 1000);
+
   return (
     <div className="user-video-wrapper-outer">
       {/* Add connection status indicator */}
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import socket from '../services/socket';
+import { useFrameScheduler } from '../utils/useFrameScheduler';
 import '../styles/WebcamPreview.css';
 import webcamPreviewAudio from '../assets/WebcamPreview.mp3';
 
@@ -14,7 +15,6 @@ const WebcamPreview: React.FC = () => {
   const videoRef = useRef<HTMLVideoElement>(null);
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const audioRef = useRef<HTMLAudioElement>(null);
-  const frameIntervalRef = useRef<number | null>(null);
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -90,24 +90,12 @@ const WebcamPreview: React.FC = () => {
         audioRef.current.pause();
         audioRef.current.currentTime = 0;
       }
-      if (frameIntervalRef.current) {
-        clearInterval(frameIntervalRef.current);
-      }
+      stopFrameCapture();
       // Clean up socket listeners
       socket.rawSocket.off('frame_received');
     };
   }, []);
 
-  const startFrameCapture = () => {
-    if (frameIntervalRef.current) {
-      clearInterval(frameIntervalRef.current);
-    }
-    
-    frameIntervalRef.current = setInterval(() => {
-      captureAndSendFrame();
-    }, 2000); // Send frame every 2 seconds
-  };
-
   const captureAndSendFrame = () => {
     if (videoRef.current && canvasRef.current) {
       const canvas = canvasRef.current;
@@ -131,6 +119,9 @@ const WebcamPreview: React.FC = () => {
     }
   };
 
+  // Send a frame every 2 seconds until the server asks for another interval through 'frame_interval' events
+  const { start: startFrameCapture, stop: stopFrameCapture } = useFrameScheduler(captureAndSendFrame, 2000);
+
   const startCenteringCountdown = () => {
     if (isCheckingPosition) return; // Prevent multiple countdowns
     
@@ -0,0 +1,49 @@
+import { useCallback, useEffect, useRef } from 'react';
+import socket from '../services/socket';
+
+/**
+ * Calls sendFrame on a timeout chain whose interval follows the 'frame_interval' events of the server,
+ * which asks for fewer frames when it is loaded or when the learner's emotion is stable.
+ * Returns start/stop functions; the chain is stopped when the component unmounts.
+ */
+export const useFrameScheduler = (sendFrame: () => void, initialIntervalMs = 1000) => {
+  const frameIntervalRef = useRef(initialIntervalMs);
+  const frameTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
+  // Always call the latest sendFrame, without restarting the chain when it changes
+  const sendFrameRef = useRef(sendFrame);
+  sendFrameRef.current = sendFrame;
+
+  const stop = useCallback(() => {
+    if (frameTimerRef.current) {
+      clearTimeout(frameTimerRef.current);
+      frameTimerRef.current = null;
+    }
+  }, []);
+
+  const start = useCallback(() => {
+    stop();
+    const scheduleNextFrame = () => {
+      frameTimerRef.current = setTimeout(() => {
+        sendFrameRef.current();
+        scheduleNextFrame();
+      }, frameIntervalRef.current);
+    };
+    scheduleNextFrame();
+  }, [stop]);
+
+  useEffect(() => {
+    const onFrameInterval = (data: any) => {
+      if (typeof data?.intervalMs === 'number' && data.intervalMs > 0) {
+        frameIntervalRef.current = data.intervalMs;
+      }
+    };
+    socket.rawSocket.on('frame_interval', onFrameInterval);
+
+    return () => {
+      socket.rawSocket.off('frame_interval', onFrameInterval);
+      stop();
+    };
+  }, [stop]);
+
+  return { start, stop };
+};